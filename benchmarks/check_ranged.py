@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# Checks of the segmented progressive downloader (RangedHttpFD in engine.py)
+# Downloads synthetic files from the local media server through the real engine and
+# compares every result byte for byte with what the server sent:
+#   python3 benchmarks/check_ranged.py
+# - injected failures: cut connections and 503s while the pieces are downloaded
+# - resume: a download cancelled halfway is continued from its .part file
+# - no Range support: the server answers every request with the whole file, both
+#   for a new download and for one that was started while ranges still worked
+# - single connection: a download cancelled halfway is resumed with a fragment cap of 1
+# Runs with a temporary HOME (removed afterwards) and exits with 1 if a check fails.
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path[:0] = [REPO_DIR, BENCH_DIR]
+from media_server import MediaServer, BLOCK_SIZE
+
+JOB_TIMEOUT = 120   # seconds
+
+def expected_bytes(server, size):
+    """The bytes the media server sends for a file of `size` bytes."""
+    return (server.block * (size // BLOCK_SIZE + 1))[:size]
+
+def download(engine, url, folder, cancel_at=None):
+    """Run a video job until it ends; with `cancel_at`, cancel it at that progress (%)."""
+    job = engine.submit_job(url, 'video', folder)
+    deadline = time.monotonic() + JOB_TIMEOUT
+    while not job['ended']:
+        if time.monotonic() > deadline:
+            engine.cancel_job(job['id'])
+            raise RuntimeError(f"{url} did not finish in {JOB_TIMEOUT}s")
+        if cancel_at is not None and job['progress'] >= cancel_at:
+            engine.cancel_job(job['id'])
+        time.sleep(0.05)
+    return job
+
+def compare(server, folder, name, size):
+    """None if the file in `folder` holds exactly the server's bytes, else what is wrong."""
+    path = os.path.join(folder, f"{name}-{size}.mp4")
+    if not os.path.exists(path):
+        return f"{os.path.basename(path)} missing, folder has {sorted(os.listdir(folder))}"
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data != expected_bytes(server, size):
+        return f"{os.path.basename(path)} differs ({len(data)} of {size} bytes)"
+    return None
+
+def check_failures(engine, server, folder, size):
+    """Cut connections and 503s while the pieces are downloaded; a job that gives
+    up is run again once the server is healthy."""
+    url = f"{server.base_url}/files/failures-{size}.mp4"
+    # Extracted beforehand into the info cache, so the failures hit the download itself
+    extracted = threading.Event()
+    engine.prefetch_metadata([url], 'video', lambda index, summary: extracted.set())
+    extracted.wait(JOB_TIMEOUT)
+    failures = server.failures
+    server.failure_rate = 0.3
+    try:
+        job = download(engine, url, folder)
+    finally:
+        server.failure_rate = 0.0
+    if server.failures == failures:
+        return job, "no failure was injected while downloading"
+    if job['state'] != 'done':
+        job = download(engine, url, folder)
+    return job, compare(server, folder, 'failures', size)
+
+def check_resume(engine, server, folder, size):
+    """Cancel halfway, then download the same file again into the same folder."""
+    url = f"{server.base_url}/files/resume-{size}.mp4"
+    job = download(engine, url, folder, cancel_at=40)
+    if job['state'] != 'cancelled':
+        return job, f"first run ended as {job['state']} instead of cancelled"
+    if not any(entry.endswith('.part.ranges') for _, _, files in os.walk(folder) for entry in files):
+        return job, "no resume state was kept after cancelling"
+    job = download(engine, url, folder)
+    return job, compare(server, folder, 'resume', size)
+
+def check_no_ranges(engine, server, folder, size):
+    """The server ignores Range headers from the start."""
+    server.ranges = False
+    try:
+        job = download(engine, f"{server.base_url}/files/noranges-{size}.mp4", folder)
+    finally:
+        server.ranges = True
+    return job, compare(server, folder, 'noranges', size)
+
+def check_ranges_lost(engine, server, folder, size):
+    """Cancel halfway, then resume after the server stopped answering Range headers."""
+    url = f"{server.base_url}/files/rangeslost-{size}.mp4"
+    job = download(engine, url, folder, cancel_at=40)
+    if job['state'] != 'cancelled':
+        return job, f"first run ended as {job['state']} instead of cancelled"
+    server.ranges = False
+    try:
+        job = download(engine, url, folder)
+    finally:
+        server.ranges = True
+    return job, compare(server, folder, 'rangeslost', size)
+
+def check_single_connection(engine, server, folder, size):
+    """Cancel halfway, then resume with the fragment cap lowered to one connection."""
+    url = f"{server.base_url}/files/single-{size}.mp4"
+    job = download(engine, url, folder, cancel_at=40)
+    if job['state'] != 'cancelled':
+        return job, f"first run ended as {job['state']} instead of cancelled"
+    cap = engine.fragment_cap
+    engine.set_fragment_cap(1)
+    try:
+        job = download(engine, url, folder)
+    finally:
+        engine.set_fragment_cap(cap)
+    return job, compare(server, folder, 'single', size)
+
+CHECKS = {
+    'failures': check_failures,
+    'resume': check_resume,
+    'no-ranges': check_no_ranges,
+    'ranges-lost': check_ranges_lost,
+    'single-connection': check_single_connection,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the segmented downloader against the local media server.")
+    parser.add_argument('--checks', nargs='+', choices=CHECKS, default=list(CHECKS))
+    parser.add_argument('--size', type=int, default=12 * 1000 * 1000, help="file size in bytes (default 12 MB)")
+    parser.add_argument('--bandwidth', type=int, default=2000, help="server bandwidth per connection in KB/s")
+    parser.add_argument('--seed', type=int, default=1, help="seed of the injected failures")
+    args = parser.parse_args()
+
+    home = tempfile.mkdtemp(prefix='check-ranged-')
+    os.environ['HOME'] = home
+    server = MediaServer(bandwidth=args.bandwidth * 1024, seed=args.seed).start()
+    try:
+        import engine
+        engine.quiet = True
+        engine.warm_up()
+        if engine.missing_dependencies:
+            print("Missing dependencies: " + ", ".join(engine.missing_dependencies), file=sys.stderr)
+            return 1
+        # Short waits between retries, the checks are about the resulting bytes
+        engine.RETRY_BASE_DELAY = 0.05
+        engine.RETRY_MAX_DELAY = 0.2
+        if args.size < engine.RANGED_MIN_SIZE:
+            print(f"--size must be at least {engine.RANGED_MIN_SIZE} bytes to use the segmented downloader",
+                  file=sys.stderr)
+            return 1
+
+        failed = 0
+        for name in args.checks:
+            folder = tempfile.mkdtemp(prefix=f"{name}-", dir=home)
+            started = time.monotonic()
+            try:
+                job, problem = CHECKS[name](engine, server, folder, args.size)
+            except RuntimeError as e:
+                job, problem = None, str(e)
+            if job is not None and problem is None and job['state'] != 'done':
+                problem = f"job ended as {job['state']}: {job['error']}"
+            failed += problem is not None
+            result = "FAIL" if problem else "ok"
+            print(f"{name}: {result} ({time.monotonic() - started:.1f}s)" + (f" - {problem}" if problem else ""),
+                  flush=True)
+        return 1 if failed else 0
+    finally:
+        server.shutdown()
+        shutil.rmtree(home, ignore_errors=True)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# Local stand-in media server for benchmarks
+# Serves synthetic files that yt-dlp's generic extractor downloads like real media:
+#   /files/<name>-<size>.mp4          progressive file of <size> bytes (Range requests supported,
+#                                     unless `ranges` is turned off)
+#   /hls/<name>-<count>x<size>.m3u8   HLS playlist of <count> segments of <size> bytes
+#   /dash/<name>-<count>x<size>.mpd   DASH manifest with the same segment layout
+# Latency, a per-connection bandwidth cap and injected failures are configurable,
+# and failures are drawn from a seeded generator so runs are reproducible.
+import http.server
+import random
+import re
+import threading
+import time
+
+BLOCK_SIZE = 64 * 1024
+
+class MediaServer(http.server.ThreadingHTTPServer):
+    """Threaded HTTP server with the benchmark settings as attributes."""
+    daemon_threads = True
+
+    def __init__(self, port=0, latency=0.0, bandwidth=0, failure_rate=0.0, seed=1):
+        super().__init__(('127.0.0.1', port), MediaHandler)
+        self.latency = latency              # seconds before every response
+        self.bandwidth = bandwidth          # bytes per second per connection, 0 = unlimited
+        self.failure_rate = failure_rate    # share of media requests that fail
+        self.ranges = True                  # False: ignore Range headers, like some CDNs
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.block = random.Random(seed).randbytes(BLOCK_SIZE)
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        """Serve on a background thread."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def draw_failure(self):
+        """None, 'status' (answer 503) or 'cut' (drop the connection halfway)."""
+        with self.random_lock:
+            self.requests += 1
+            if self.random.random() >= self.failure_rate:
+                return None
+            self.failures += 1
+            return self.random.choice(('status', 'cut'))
+
+class MediaHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        path = self.path.split('?')[0]
+        match = re.fullmatch(r'/files/[\w.]+-(\d+)\.mp4', path)
+        if match:
+            return self.send_media(int(match.group(1)), 'video/mp4')
+        match = re.fullmatch(r'/hls/[\w.]+-(\d+)x(\d+)\.m3u8', path)
+        if match:
+            return self.send_text(hls_playlist(int(match.group(1)), int(match.group(2))),
+                                  'application/vnd.apple.mpegurl')
+        match = re.fullmatch(r'/dash/[\w.]+-(\d+)x(\d+)\.mpd', path)
+        if match:
+            return self.send_text(dash_manifest(int(match.group(1)), int(match.group(2))),
+                                  'application/dash+xml')
+        match = re.fullmatch(r'/(?:hls|dash)/seg-(\d+)-(\d+)\.(?:ts|m4s|mp4)', path)
+        if match:
+            return self.send_media(int(match.group(2)), 'video/mp2t')
+        self.send_error(404)
+
+    do_HEAD = do_GET
+
+    def send_text(self, text, content_type):
+        body = text.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_media(self, size, content_type):
+        """Send `size` synthetic bytes (or the requested range of them)."""
+        failure = self.server.draw_failure()
+        if failure == 'status':
+            self.send_error(503)
+            return
+        start, end = 0, size - 1
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match and self.server.ranges:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        length = end - start + 1
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+
+        # A cut connection stops after half of the body, like a dropped link
+        limit = length // 2 if failure == 'cut' else length
+        sent = 0
+        started = time.monotonic()
+        block = self.server.block
+        try:
+            while sent < limit:
+                offset = (start + sent) % BLOCK_SIZE
+                chunk = block[offset:offset + min(BLOCK_SIZE - offset, limit - sent)]
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if self.server.bandwidth:
+                    ahead = sent / self.server.bandwidth - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        if failure == 'cut':
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+def hls_playlist(count, size):
+    """HLS media playlist with `count` one-second segments."""
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:1', '#EXT-X-MEDIA-SEQUENCE:0']
+    for index in range(count):
+        lines += ['#EXTINF:1.0,', f'seg-{index}-{size}.ts']
+    lines.append('#EXT-X-ENDLIST')
+    return "\n".join(lines) + "\n"
+
+def dash_manifest(count, size):
+    """Static DASH manifest with `count` one-second segments of one audio+video representation."""
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" mediaPresentationDuration="PT{count}S"
+     minBufferTime="PT2S" profiles="urn:mpeg:dash:profile:isoff-live:2011">
+  <Period>
+    <AdaptationSet mimeType="video/mp4">
+      <Representation id="av" bandwidth="{size * 8}" codecs="avc1.4d401f,mp4a.40.2" width="640" height="360">
+        <SegmentTemplate timescale="1" duration="1" startNumber="1"
+                         initialization="seg-0-{size}.mp4" media="seg-$Number$-{size}.m4s"/>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+'''
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# Offline benchmark suite
+# Drives the real download path (engine.py + yt-dlp's generic extractor) against the
+# local media server and reports the results as JSON, so runs can be compared:
+#   python3 benchmarks/run.py -o results.json
+#   python3 benchmarks/run.py --jobs 8 --latency 50 --bandwidth 2000 --failure-rate 0.05
+# The server runs in this process; every scenario downloads in a fresh child process
+# with its own temporary HOME (so the user's archive and caches are not touched) and
+# its own peak memory measurement. The temporary folders are removed afterwards.
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+from media_server import MediaServer
+
+# The audio scenario downloads the progressive files as audio jobs (extracted by ffmpeg)
+SCENARIOS = ('progressive', 'hls', 'dash', 'audio')
+
+def scenario_urls(base_url, scenario, count, args):
+    """Links of `count` distinct media of a scenario on the media server."""
+    if scenario == 'progressive':
+        return [f"{base_url}/files/p{index}-{args.file_size}.mp4" for index in range(count)]
+    if scenario == 'audio':
+        return [f"{base_url}/files/a{index}-{args.file_size}.mp4" for index in range(count)]
+    layout = f"{args.segments}x{args.segment_size}"
+    if scenario == 'hls':
+        return [f"{base_url}/hls/h{index}-{layout}.m3u8" for index in range(count)]
+    return [f"{base_url}/dash/d{index}-{layout}.mpd" for index in range(count)]
+
+def child_env(home):
+    """Environment of a child run: a private HOME, the repository on the path."""
+    env = dict(os.environ, HOME=home, PYTHONPATH=REPO_DIR)
+    env.pop('XDG_CONFIG_HOME', None)
+    return env
+
+def run_child(arguments, home):
+    """Run this script in child mode and return the JSON object it prints last."""
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), *arguments],
+                            capture_output=True, text=True, env=child_env(home), cwd=REPO_DIR)
+    if result.returncode != 0:
+        raise RuntimeError(f"benchmark child failed: {result.stderr.strip()[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+# Child mode
+
+def child_startup():
+    """Time the engine import and warm-up (the work before the first download can start)."""
+    started = time.perf_counter()
+    import engine
+    imported = time.perf_counter()
+    engine.warm_up()
+    ready = time.perf_counter()
+    return {'import_seconds': imported - started, 'ready_seconds': ready - started}
+
+def child_download(urls, workers, download_type):
+    """Download `urls` with the engine and measure the run."""
+    import engine
+    engine.quiet = True
+    engine.warm_up()
+    engine.set_max_workers(workers)
+
+    # Time spent in the progress hook: it runs on the download threads for every block
+    hook_lock = threading.Lock()
+    hook_stats = {'calls': 0, 'seconds': 0.0}
+    progress_hook = engine.progress_hook
+
+    def timed_progress_hook(job, d):
+        started = time.perf_counter()
+        try:
+            return progress_hook(job, d)
+        finally:
+            with hook_lock:
+                hook_stats['calls'] += 1
+                hook_stats['seconds'] += time.perf_counter() - started
+    engine.progress_hook = timed_progress_hook
+
+    # Inside the temporary HOME, which the parent removes
+    folder = tempfile.mkdtemp(prefix='bench-', dir=os.path.expanduser('~'))
+    started = time.perf_counter()
+    submitted = [engine.submit_job(url, download_type, folder) for url in urls]
+    while not all(job['ended'] for job in submitted):
+        time.sleep(0.01)
+    wall = time.perf_counter() - started
+
+    total_bytes = sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file())
+    return {
+        'type': download_type,
+        'jobs': len(submitted),
+        'workers': workers,
+        'done': sum(job['state'] == 'done' for job in submitted),
+        'failed': sum(job['state'] == 'failed' for job in submitted),
+        'bytes': total_bytes,
+        'wall_seconds': wall,
+        'throughput_bytes_per_second': total_bytes / wall if wall else None,
+        # Only the engine's progress hook; the redraws of the GUI are not part of it
+        'progress_hook_calls': hook_stats['calls'],
+        'progress_hook_seconds': hook_stats['seconds'],
+        'progress_hook_microseconds_per_call': (hook_stats['seconds'] / hook_stats['calls'] * 1e6
+                                                if hook_stats['calls'] else None),
+        # Time the jobs spent in the post-processing state, waiting for the ffmpeg pool included
+        'postprocess_state_seconds': sum(job['timings'].get('post-processing', 0) for job in submitted),
+        'extract_seconds': sum(job['timings'].get('extracting', 0) for job in submitted),
+        'retries': sum(job['retries'] for job in submitted),
+        'errors': sorted({job['error'] for job in submitted if job['error']}),
+    }
+
+def child_main(args):
+    if args.child == 'startup':
+        result = child_startup()
+    else:
+        result = child_download(args.urls, args.workers, args.type)
+    # ru_maxrss is in KiB on Linux
+    result['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps(result))
+
+# Parent mode
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=REPO_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def yt_dlp_version(home):
+    result = subprocess.run([sys.executable, '-c', 'import yt_dlp.version as v; print(v.__version__)'],
+                            capture_output=True, text=True, env=child_env(home))
+    return result.stdout.strip() or None
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the download engine.")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--jobs', type=int, default=4, help="size of the concurrent batch (default 4)")
+    parser.add_argument('--file-size', type=int, default=16 * 1024 * 1024, help="progressive file size in bytes")
+    parser.add_argument('--segments', type=int, default=40, help="HLS/DASH segments per media")
+    parser.add_argument('--segment-size', type=int, default=256 * 1024, help="HLS/DASH segment size in bytes")
+    parser.add_argument('--latency', type=float, default=0, help="server latency per request in ms")
+    parser.add_argument('--bandwidth', type=int, default=0, help="server bandwidth per connection in KB/s (0 = unlimited)")
+    parser.add_argument('--failure-rate', type=float, default=0, help="share of media requests that fail (0-1)")
+    parser.add_argument('--seed', type=int, default=1, help="seed of the injected failures")
+    parser.add_argument('--startup-runs', type=int, default=3)
+    parser.add_argument('-o', '--output', help="write the JSON results to this file instead of stdout")
+    # Internal: run one measurement in a child process
+    parser.add_argument('--child', choices=('startup', 'download'), help=argparse.SUPPRESS)
+    parser.add_argument('--urls', nargs='*', help=argparse.SUPPRESS)
+    parser.add_argument('--workers', type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument('--type', choices=('video', 'audio'), default='video', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child_main(args)
+
+    server = MediaServer(latency=args.latency / 1000, bandwidth=args.bandwidth * 1024,
+                         failure_rate=args.failure_rate, seed=args.seed).start()
+    homes = tempfile.mkdtemp(prefix='bench-homes-')
+    try:
+        report = run_benchmarks(args, server, homes)
+    finally:
+        server.shutdown()
+        shutil.rmtree(homes, ignore_errors=True)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+def run_benchmarks(args, server, homes):
+    """Run every measurement, each child with a fresh HOME below `homes`, and build the report."""
+    new_home = lambda: tempfile.mkdtemp(prefix='home-', dir=homes)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'yt_dlp': yt_dlp_version(new_home()),
+        'platform': platform.platform(),
+        'parameters': {key: value for key, value in vars(args).items()
+                       if key not in ('child', 'urls', 'workers', 'type', 'output')},
+        'startup': None,
+        'results': [],
+        'skipped': {},
+    }
+
+    startups = [run_child(['--child', 'startup'], new_home()) for _ in range(args.startup_runs)]
+    if startups:
+        report['startup'] = {
+            'runs': startups,
+            'median_ready_seconds': statistics.median(run['ready_seconds'] for run in startups),
+        }
+
+    for scenario in args.scenarios:
+        if scenario == 'audio' and not shutil.which('ffmpeg'):
+            report['skipped'][scenario] = "ffmpeg not found"
+            print(f"{scenario}: skipped, ffmpeg not found", file=sys.stderr)
+            continue
+        download_type = 'audio' if scenario == 'audio' else 'video'
+        for count in sorted({1, args.jobs}):
+            # A fresh HOME per run, so nothing is skipped by the archive or served from the info cache
+            urls = scenario_urls(server.base_url, scenario, count, args)
+            result = run_child(['--child', 'download', '--workers', str(count), '--type', download_type,
+                                '--urls', *urls], new_home())
+            result['scenario'] = scenario
+            print(f"{scenario} x{count}: {result['throughput_bytes_per_second'] / 1024 ** 2:.1f} MiB/s, "
+                  f"{result['wall_seconds']:.2f}s, "
+                  f"progress hook {result['progress_hook_microseconds_per_call'] or 0:.0f} us/call, "
+                  f"peak {result['peak_rss_kb'] / 1024:.0f} MiB", file=sys.stderr)
+            report['results'].append(result)
+
+    report['server'] = {'requests': server.requests, 'failures': server.failures}
+    return report
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,14 @@ set -e  # Hata olursa dur
 APP_NAME="YT-DLP-GUI"
 PYTHON_VERSION="3.11"  # Uyumlu Python versiyonu
 
+# ./build.sh --onedir: uygulamayı açılmış klasör olarak AppImage içine koy.
+# --onefile paketi her açılışta kendini /tmp altına çıkarır; onedir ile bu adım
+# atlanır ve pencere daha hızlı açılır.
+PYINSTALLER_MODE="--onefile"
+if [ "$1" = "--onedir" ]; then
+    PYINSTALLER_MODE="--onedir"
+fi
+
 echo "========================================="
 echo "YT-DLP-GUI AppImage Builder"
 echo "========================================="
@@ -66,7 +74,7 @@ echo "[5/8] Building with PyInstaller..."
 # Eski build dosyalarını temizle
 rm -rf build dist *.spec
 
-pyinstaller --onefile \
+pyinstaller $PYINSTALLER_MODE \
     --windowed \
     --add-binary "ffmpeg-static/ffmpeg:." \
     --add-binary "ffmpeg-static/ffprobe:." \
@@ -75,7 +83,7 @@ pyinstaller --onefile \
     --hidden-import=_tkinter \
     yt-dlp-gui.py
 
-echo "✅ PyInstaller build complete"
+echo "✅ PyInstaller build complete ($PYINSTALLER_MODE)"
 
 # 6. AppDir yapısı oluştur
 echo ""
@@ -87,8 +95,12 @@ mkdir -p "$APP_DIR/usr/bin"
 mkdir -p "$APP_DIR/usr/share/applications"
 mkdir -p "$APP_DIR/usr/share/icons/hicolor/256x256/apps"
 
-# Binary'yi kopyala
-cp "dist/$APP_NAME" "$APP_DIR/usr/bin/"
+# Binary'yi kopyala (onedir modunda tüm klasör)
+if [ "$PYINSTALLER_MODE" = "--onedir" ]; then
+    cp -r "dist/$APP_NAME/." "$APP_DIR/usr/bin/"
+else
+    cp "dist/$APP_NAME" "$APP_DIR/usr/bin/"
+fi
 chmod +x "$APP_DIR/usr/bin/$APP_NAME"
 
 # Desktop dosyası oluştur
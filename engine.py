@@ -0,0 +1,3036 @@
+# YT-DLP-GUI download engine
+# Queue, workers, archive, caches and the yt-dlp integration, without any Tk code.
+# Shared by the GUI (yt-dlp-gui.py) and the command line/daemon (yt-dlp-cli.py).
+import threading
+import queue
+import os
+import json
+import re
+import errno
+import atexit
+import hmac
+from datetime import datetime
+import shutil
+import random
+import copy
+import time
+import zlib
+import socket
+import itertools
+import http.client
+import http.server
+from urllib.parse import urlparse, parse_qs
+import sqlite3
+import fcntl
+
+# yt_dlp is imported by warm_up(), which the GUI runs on a background thread so
+# the window does not wait for its hundreds of extractor modules
+yt_dlp = None
+
+# Download queue limits
+DEFAULT_MAX_WORKERS = 3
+MAX_WORKERS_LIMIT = 10
+
+# Parallel fragments for HLS/DASH downloads: every job starts with
+# INITIAL_FRAGMENTS and is tuned per site from measured throughput, while the
+# total over all running jobs stays within the fragment cap. The cap is a soft
+# limit: a running job always gets one connection, so with more running jobs
+# than the cap allows, each of them downloads over a single connection
+DEFAULT_FRAGMENT_CAP = 16
+FRAGMENT_CAP_LIMIT = 64
+INITIAL_FRAGMENTS = 3
+
+# Progressive (single file) HTTP downloads of at least RANGED_MIN_SIZE are fetched
+# over parallel Range requests; the connection count is granted like fragments
+RANGED_MIN_SIZE = 4 * 1024 * 1024
+RANGED_MIN_PIECE = 512 * 1024       # pieces are not split further below this size
+RANGED_STATE_INTERVAL = 1.0         # seconds between saves of the resume state
+
+# Download types. 'both' fetches the video once and derives the audio file from
+# the downloaded video locally, so getting both costs one download
+DOWNLOAD_TYPES = ('video', 'audio', 'both')
+
+# Audio output formats. 'original' keeps the downloaded codec and only
+# stream-copies it into a matching container; the others re-encode when the
+# source codec differs. Each format prefers sources that need no re-encode.
+AUDIO_FORMATS = ('original', 'mp3', 'm4a', 'opus', 'flac')
+DEFAULT_AUDIO_FORMAT = 'mp3'
+AUDIO_FORMAT_SELECTORS = {
+    'm4a': 'bestaudio[ext=m4a]/bestaudio/best',
+    'opus': 'bestaudio[acodec=opus]/bestaudio/best',
+}
+audio_format = DEFAULT_AUDIO_FORMAT
+
+# Format of video downloads: the best single file up to 1080p
+VIDEO_FORMAT_SELECTOR = 'best[height<=1080]/best'
+
+# ffmpeg work (merging, audio conversion) runs on its own pool, one worker per core,
+# so a download worker can start the next download right away
+POSTPROCESS_WORKERS = os.cpu_count() or 2
+
+# Bandwidth budget shared by all running downloads (KiB/s, 0 = unlimited).
+# Under a limit every job gets bandwidth in proportion to its priority weight;
+# playlist entries run at low priority, "Download First" jobs at high.
+DEFAULT_BANDWIDTH_LIMIT = 0
+BANDWIDTH_LIMIT_MAX = 1000000
+BANDWIDTH_BURST = 0.5               # seconds of budget that may be saved up while idle
+BANDWIDTH_BLOCK_SIZE = 128 * 1024   # read size, so waits stay short and smooth
+PRIORITY_WEIGHTS = {'high': 8, 'normal': 2, 'low': 1}
+
+# Telemetry: one JSON line per finished job, and optionally Prometheus metrics on
+# http://127.0.0.1:<metrics_port>/metrics (set metrics_port in config.json)
+DEFAULT_METRICS_PORT = 0    # 0 = no metrics endpoint
+# The daemon serves the job API (and /metrics) on this localhost port
+DEFAULT_DAEMON_PORT = 9465
+# Job API clients send the token from the api_token file next to config.json in
+# this header, so web pages (which can POST to localhost) cannot queue jobs
+API_TOKEN_HEADER = 'X-Api-Token'
+PHASE_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800)
+SPEED_BUCKETS = (64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+
+# Links resolved at the same time when a batch of pasted links is previewed
+PREFETCH_WORKERS = 6
+
+# Extraction cache defaults (overridable in config.json)
+DEFAULT_INFO_CACHE_TTL = 3600       # seconds; stream URLs of most sites expire after a few hours
+DEFAULT_INFO_CACHE_MAX_MB = 64
+
+# Network failures are retried with the same format, continuing the .part file.
+# The waits grow exponentially and are jittered, so parallel jobs do not retry in lockstep
+NETWORK_RETRIES = 3
+RETRY_BASE_DELAY = 2    # seconds; the n-th retry waits up to RETRY_BASE_DELAY * 2**n
+RETRY_MAX_DELAY = 60
+
+# Rate limiting opens a circuit breaker per site (see "Circuit breaker" below)
+THROTTLE_RETRIES = 6            # rate-limited attempts of one job before it fails
+CIRCUIT_THRESHOLD = 2           # rate-limited attempts in a row that open a site's circuit
+CIRCUIT_COOLDOWN = 60           # seconds a site is paused; doubles on every trip up to the max
+CIRCUIT_MAX_COOLDOWN = 900
+# A single HTTP 403 mostly means an expired stream URL; this many in a row from a
+# site (or any after a 429 or bot check) mean it blocks us, like rate limiting
+FORBIDDEN_THRESHOLD = 2
+
+# Alternative formats a job tries after format errors before it fails
+MAX_FORMAT_FALLBACKS = 3
+
+# Error message fragments of a site that throttles us
+THROTTLE_ERROR_MARKERS = (
+    'too many requests',
+    'rate limit',
+    'rate-limit',
+    'try again later',
+)
+
+# Auth error fragments that are bot checks, i.e. throttling as well
+BOT_CHECK_MARKERS = (
+    'sign in to confirm',
+    'not a bot',
+)
+
+# Error message fragments that mean the site wants a login or a bot check
+AUTH_ERROR_MARKERS = (
+    'sign in to confirm',
+    'confirm you’re not a bot',
+    "confirm you're not a bot",
+    'login required',
+    'use --cookies',
+    'private video',
+    'members-only',
+)
+
+# Shown next to auth errors (the GUI uses its translated text instead)
+AUTH_HINT = "Sign-in or bot check required. Add cookies to ~/.config/yt-dlp-gui/cookies.txt and try again."
+
+# Error message fragments of interrupted or unreachable connections
+NETWORK_ERROR_MARKERS = (
+    'timed out',
+    'connection reset',
+    'connection refused',
+    'connection aborted',
+    'remote end closed connection',
+    'temporary failure in name resolution',
+    'network is unreachable',
+    'incompleteread',
+    'bytes read',
+    ' bytes, expected ',
+    'unable to download video data',
+)
+
+# How many discovered playlist entries may wait in the queue before
+# enumeration pauses; keeps memory flat for very large playlists/channels
+PLAYLIST_LOOKAHEAD = 20
+
+# Subscriptions: saved channels/playlists that are checked for new entries on a schedule
+DEFAULT_SUBSCRIPTION_HOURS = 24
+SUBSCRIPTION_CHECK_INTERVAL = 60    # seconds between looks for due subscriptions
+SUBSCRIPTION_POLLS_AT_ONCE = 4      # subscriptions enumerated at the same time
+SUBSCRIPTION_SEEN_MAX = 200         # newest entry ids remembered per subscription
+
+# Output files: partial and fragment files are written to OUTPUT_TEMP_DIR inside the
+# download folder, so finished files are moved into the folder with a rename on the
+# same filesystem. Downloads only start when their estimated size fits the free space
+OUTPUT_TEMP_DIR = ".yt-dlp-gui-temp"
+OUTPUT_NAME_TEMPLATE = "%(title)s%(output_suffix|)s"  # output_suffix is " (2)", ... on name clashes
+DISK_FREE_MARGIN = 64 * 1024 * 1024     # bytes that are always left free
+DISK_RECHECK_INTERVAL = 5               # seconds between free space checks of a waiting job
+# Peak disk use relative to the download size: audio conversion keeps the source
+# until the converted file is written, 'both' keeps the video next to the audio
+DISK_SPACE_FACTORS = {'video': 1.0, 'audio': 2.0, 'both': 1.25}
+# Extensions the 'original' audio format can end up with, by the codec of the download
+ORIGINAL_AUDIO_EXTENSIONS = ('m4a', 'mp3', 'ogg', 'opus', 'flac', 'wav')
+
+# Shown next to disk space errors (the GUI uses its translated text instead)
+DISK_HINT = f"Free up space in the download folder and try again; partial downloads are kept in {OUTPUT_TEMP_DIR}."
+
+# Settings changes are written to config.json together, this many seconds after the first one
+CONFIG_SAVE_DELAY = 1.0
+
+def get_config_path():
+    """Get the configuration file path in ~/.config/yt-dlp-gui folder."""
+    config_dir = os.path.expanduser("~/.config/yt-dlp-gui")
+    
+    try:
+        if not os.path.exists(config_dir):
+            os.makedirs(config_dir)
+    except:
+        import tempfile
+        config_dir = tempfile.gettempdir()
+    
+    return os.path.join(config_dir, "config.json")
+
+def get_cookies_path():
+    """Get the cookies file path for YouTube authentication."""
+    config_dir = os.path.expanduser("~/.config/yt-dlp-gui")
+    try:
+        if not os.path.exists(config_dir):
+            os.makedirs(config_dir)
+    except:
+        pass
+    return os.path.join(config_dir, "cookies.txt")
+
+# Settings cache
+# config.json is read once and then served from memory; edits by another process
+# are picked up by mtime. save_config changes the cached settings right away and
+# writes the file CONFIG_SAVE_DELAY later, so a burst of changes (e.g. clicking
+# through a spinbox) is a single write. Pending changes are flushed at exit.
+config_lock = threading.Lock()
+config_cache = None
+config_mtime = None
+config_save_timer = None
+
+def cached_config():
+    """The current settings, read from the config file if it changed (call with config_lock)."""
+    global config_cache, config_mtime
+    config_file = get_config_path()
+    try:
+        mtime = os.stat(config_file).st_mtime_ns
+    except OSError:
+        mtime = None
+    # Changes that are not written yet win over the file
+    if config_cache is not None and (mtime == config_mtime or config_save_timer is not None):
+        return config_cache
+    default_config = {
+        'language': 'en',
+        'theme': 'dark',
+        'max_workers': DEFAULT_MAX_WORKERS,
+        'fragment_cap': DEFAULT_FRAGMENT_CAP,
+        'bandwidth_limit_kb': DEFAULT_BANDWIDTH_LIMIT,
+        'bandwidth_schedule': [],
+        'audio_format': DEFAULT_AUDIO_FORMAT,
+        'info_cache_ttl': DEFAULT_INFO_CACHE_TTL,
+        'info_cache_max_mb': DEFAULT_INFO_CACHE_MAX_MB,
+        'metrics_port': DEFAULT_METRICS_PORT,
+        'daemon_port': DEFAULT_DAEMON_PORT,
+        'use_daemon': False,
+    }
+    
+    config_cache = default_config
+    try:
+        if mtime is not None:
+            with open(config_file, 'r') as f:
+                # Older config files do not know about newer settings
+                config_cache = {**default_config, **json.load(f)}
+    except:
+        pass
+    config_mtime = mtime
+    return config_cache
+
+def load_config():
+    """Load configuration from config file."""
+    with config_lock:
+        return copy.deepcopy(cached_config())
+
+def save_config(language=None, theme=None, **settings):
+    """Save configuration; the file is written shortly after (see flush_config)."""
+    global config_save_timer
+    with config_lock:
+        config = cached_config()
+        
+        if language is not None:
+            config['language'] = language
+        if theme is not None:
+            config['theme'] = theme
+        for key, value in settings.items():
+            if value is not None:
+                config[key] = copy.deepcopy(value)
+        
+        if config_save_timer is None:
+            config_save_timer = threading.Timer(CONFIG_SAVE_DELAY, flush_config)
+            config_save_timer.daemon = True
+            config_save_timer.start()
+
+def flush_config():
+    """Write pending settings changes to the config file (atomically)."""
+    global config_save_timer, config_mtime
+    with config_lock:
+        if config_save_timer is None:
+            return
+        config_save_timer.cancel()
+        config_save_timer = None
+        config_file = get_config_path()
+        try:
+            with open(config_file + ".tmp", 'w') as f:
+                json.dump(config_cache, f, indent=2)
+            os.replace(config_file + ".tmp", config_file)
+            config_mtime = os.stat(config_file).st_mtime_ns
+        except OSError:
+            pass
+
+atexit.register(flush_config)
+
+def get_archive_path():
+    """Get the download archive database path, next to the configuration file."""
+    return os.path.join(os.path.dirname(get_config_path()), "archive.sqlite3")
+
+# Download archive
+# One row per (extractor, video id, download type) that was downloaded successfully.
+# Lookups use the primary key index, so checking a whole playlist stays cheap.
+archive_lock = threading.Lock()
+archive_db = None
+
+def open_archive():
+    """Open (and create if needed) the download archive database."""
+    global archive_db
+    with archive_lock:
+        if archive_db is None:
+            archive_db = sqlite3.connect(get_archive_path(), check_same_thread=False)
+            archive_db.execute(
+                "CREATE TABLE IF NOT EXISTS downloads ("
+                " extractor TEXT NOT NULL,"
+                " video_id TEXT NOT NULL,"
+                " download_type TEXT NOT NULL,"
+                " title TEXT,"
+                " filepath TEXT,"
+                " downloaded_at TEXT,"
+                " PRIMARY KEY (extractor, video_id, download_type)"
+                ") WITHOUT ROWID")
+            archive_db.commit()
+    return archive_db
+
+def archive_types(download_type):
+    """Types a download is recorded as; 'both' counts as a video and an audio download."""
+    return ('video', 'audio') if download_type == 'both' else (download_type,)
+
+def archive_contains(archive_key, download_type):
+    """Check whether (extractor, video id) was already downloaded as this type."""
+    if archive_key is None:
+        return False
+    types = archive_types(download_type)
+    try:
+        db = open_archive()
+        with archive_lock:
+            row = db.execute(
+                "SELECT COUNT(*) FROM downloads WHERE extractor = ? AND video_id = ? AND download_type IN "
+                f"({', '.join('?' * len(types))})", (archive_key[0], archive_key[1], *types)).fetchone()
+        return row[0] == len(types)
+    except sqlite3.Error:
+        return False
+
+def archive_add(archive_key, download_type, title=None, filepath=None):
+    """Record a finished download in the archive."""
+    try:
+        db = open_archive()
+        with archive_lock:
+            db.execute(
+                "INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?, ?)",
+                (archive_key[0], archive_key[1], download_type, title, filepath,
+                 datetime.now().isoformat(timespec='seconds')))
+            db.commit()
+    except sqlite3.Error:
+        pass
+
+def archive_key_for_info(info):
+    """Build the archive key of an info dict or flat playlist entry, or None."""
+    extractor = info.get('extractor_key') or info.get('ie_key')
+    if not extractor or not info.get('id'):
+        return None
+    return (extractor.lower(), str(info['id']))
+
+def archive_key_for_url(url):
+    """Work out the archive key of a URL without any network access.
+    
+    Same approach as yt-dlp's own download archive: find the extractor
+    that handles the URL and let it parse the video id out of the URL.
+    """
+    for ie in yt_dlp.extractor.gen_extractor_classes():
+        if ie.ie_key() == 'Generic':
+            continue
+        if ie.suitable(url):
+            video_id = ie.get_temp_id(url)
+            if video_id:
+                return (ie.ie_key().lower(), video_id)
+            return None
+    return None
+
+def archive_record_info(info, download_type):
+    """Record a downloaded video (or every downloaded entry of a playlist)."""
+    if not info:
+        return
+    if info.get('_type') in ('playlist', 'multi_video'):
+        for entry in info.get('entries') or []:
+            if isinstance(entry, dict):
+                archive_record_info(entry, download_type)
+        return
+    archive_key = archive_key_for_info(info)
+    if archive_key is None:
+        return
+    filepath = info.get('filepath') or (info.get('requested_downloads') or [{}])[0].get('filepath')
+    for archive_type in archive_types(download_type):
+        archive_add(archive_key, archive_type, info.get('title'), filepath)
+
+def import_archive_file(path, download_type):
+    """Import a yt-dlp `--download-archive` text file ("extractor id" per line)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = []
+        for line in f:
+            parts = line.strip().split(' ', 1)
+            if len(parts) == 2:
+                rows.extend((parts[0].lower(), parts[1], archive_type, None, None,
+                             datetime.now().isoformat(timespec='seconds'))
+                            for archive_type in archive_types(download_type))
+    db = open_archive()
+    with archive_lock:
+        changes_before = db.total_changes
+        db.executemany("INSERT OR IGNORE INTO downloads VALUES (?, ?, ?, ?, ?, ?)", rows)
+        db.commit()
+        count = db.total_changes - changes_before
+    return count
+
+def export_archive_file(path):
+    """Export the archive as a yt-dlp `--download-archive` text file."""
+    db = open_archive()
+    with archive_lock:
+        rows = db.execute(
+            "SELECT DISTINCT extractor, video_id FROM downloads ORDER BY extractor, video_id").fetchall()
+    with open(path, 'w', encoding='utf-8') as f:
+        for extractor, video_id in rows:
+            f.write(f"{extractor} {video_id}\n")
+    return len(rows)
+
+def get_info_cache_path():
+    """Get the extraction cache database path, next to the configuration file."""
+    return os.path.join(os.path.dirname(get_config_path()), "info_cache.sqlite3")
+
+def get_telemetry_path():
+    """Get the per-job telemetry log path, next to the configuration file."""
+    return os.path.join(os.path.dirname(get_config_path()), "telemetry.jsonl")
+
+def get_journal_path():
+    """Get the job journal path, next to the configuration file."""
+    return os.path.join(os.path.dirname(get_config_path()), "jobs.journal")
+
+def get_api_token_path():
+    """Get the job API token file path, next to the configuration file."""
+    return os.path.join(os.path.dirname(get_config_path()), "api_token")
+
+def get_api_token():
+    """The secret of the job API, created on first use; None if it cannot be stored.
+    
+    Only the user can read the file: local clients of the same user send it,
+    anything else (e.g. a web page in the browser) cannot know it.
+    """
+    path = get_api_token_path()
+    for _ in range(2):
+        try:
+            with open(path, encoding='utf-8') as f:
+                token = f.read().strip()
+            if token:
+                return token
+        except OSError:
+            pass
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            continue  # another process is creating it right now
+        except OSError:
+            return None
+        token = os.urandom(16).hex()
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(token + "\n")
+        return token
+    return None
+
+def get_subscriptions_path():
+    """Get the subscriptions file path, next to the configuration file."""
+    return os.path.join(os.path.dirname(get_config_path()), "subscriptions.json")
+
+# Extraction cache
+# Resolved info dicts per URL, so retries and re-queued links skip the page
+# fetch and extraction. Entries expire after `info_cache_ttl` seconds and the
+# least recently used ones are evicted once the cache grows past its size limit.
+info_cache_lock = threading.Lock()
+info_cache_db = None
+info_cache_ttl = DEFAULT_INFO_CACHE_TTL
+info_cache_max_bytes = DEFAULT_INFO_CACHE_MAX_MB * 1024 * 1024
+
+def open_info_cache():
+    """Open (and create if needed) the extraction cache database."""
+    global info_cache_db
+    with info_cache_lock:
+        if info_cache_db is None:
+            info_cache_db = sqlite3.connect(get_info_cache_path(), check_same_thread=False)
+            info_cache_db.execute(
+                "CREATE TABLE IF NOT EXISTS info_cache ("
+                " url TEXT PRIMARY KEY,"
+                " info BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL"
+                ")")
+            info_cache_db.execute(
+                "CREATE INDEX IF NOT EXISTS info_cache_last_used ON info_cache (last_used)")
+            info_cache_db.commit()
+    return info_cache_db
+
+def info_cache_get(url):
+    """Return the cached info dict of a URL, or None if missing or expired."""
+    try:
+        db = open_info_cache()
+        now = time.time()
+        with info_cache_lock:
+            row = db.execute("SELECT info, created_at FROM info_cache WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > info_cache_ttl:
+                db.execute("DELETE FROM info_cache WHERE url = ?", (url,))
+                db.commit()
+                return None
+            db.execute("UPDATE info_cache SET last_used = ? WHERE url = ?", (now, url))
+            db.commit()
+        return json.loads(zlib.decompress(row[0]))
+    except (sqlite3.Error, zlib.error, ValueError):
+        return None
+
+def info_cache_put(url, info):
+    """Store an info dict for a URL and evict least recently used entries past the size limit."""
+    try:
+        blob = zlib.compress(json.dumps(info).encode('utf-8'))
+        db = open_info_cache()
+        now = time.time()
+        with info_cache_lock:
+            db.execute("INSERT OR REPLACE INTO info_cache VALUES (?, ?, ?, ?, ?)",
+                       (url, blob, len(blob), now, now))
+            db.execute("DELETE FROM info_cache WHERE created_at < ?", (now - info_cache_ttl,))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM info_cache").fetchone()[0]
+            if total > info_cache_max_bytes:
+                for old_url, size in db.execute(
+                        "SELECT url, size FROM info_cache ORDER BY last_used").fetchall():
+                    if total <= info_cache_max_bytes:
+                        break
+                    db.execute("DELETE FROM info_cache WHERE url = ?", (old_url,))
+                    total -= size
+            db.commit()
+    except (sqlite3.Error, TypeError, ValueError):
+        pass
+
+def info_cache_delete(url):
+    """Drop the cached info dict of a URL (e.g. after its stream URLs stopped working)."""
+    try:
+        db = open_info_cache()
+        with info_cache_lock:
+            db.execute("DELETE FROM info_cache WHERE url = ?", (url,))
+            db.commit()
+    except sqlite3.Error:
+        pass
+
+def get_ffmpeg_path():
+    """Find ffmpeg in system PATH."""
+    ffmpeg_path = shutil.which('ffmpeg')
+    return ffmpeg_path if ffmpeg_path else 'ffmpeg'
+
+def find_missing_dependencies():
+    """List required dependencies that are not installed."""
+    missing = []
+    
+    if yt_dlp is None:
+        missing.append('yt-dlp')
+    
+    # Check ffmpeg - needed for video merging and audio extraction
+    if not shutil.which('ffmpeg'):
+        missing.append('ffmpeg')
+    return missing
+
+# Set by the command line: keep yt-dlp's own console output and progress lines quiet
+quiet = False
+
+# Startup
+# warm_up imports yt_dlp and probes dependencies; it may run in the background
+# while workers and playlist enumeration wait for engine_ready.
+engine_ready = threading.Event()
+missing_dependencies = []
+
+def warm_up():
+    """Import yt_dlp and check dependencies (blocking; see engine_ready)."""
+    global yt_dlp
+    try:
+        import yt_dlp
+    except ImportError:
+        pass  # listed in missing_dependencies
+    else:
+        define_pipeline_ydl()
+        define_ranged_downloader()
+        # Load the extractor list now rather than at the first archive lookup
+        yt_dlp.extractor.gen_extractor_classes()
+    missing_dependencies.extend(find_missing_dependencies())
+    engine_ready.set()
+
+# Download queue state
+# Job records are plain dicts kept in `jobs`; `job_queue` holds the ids of jobs
+# that are still waiting for a worker, in the order they will be started.
+jobs = {}
+job_queue = []
+queue_cond = threading.Condition()
+# Called with every job that changed, from any thread (the GUI queues a redraw,
+# the CLI prints progress). Every change also gives the job a new 'version',
+# which lets API clients fetch only what changed.
+job_listeners = []
+# Called with (key, fields) for engine notices that belong to no single job, such
+# as a throttled site or a port that could not be opened. MESSAGES holds their
+# English text; the GUI shows them in its message line, the CLI prints them.
+message_listeners = []
+MESSAGES = {
+    'site_throttled': "{site} is rate limiting; its jobs are paused for {cooldown}s",
+    'api_disabled': "Local API on port {port} disabled: {error}",
+    'cookies_not_saved': "Could not save cookies: {error}",
+}
+job_versions = itertools.count(1)
+job_counter = 0
+max_workers = DEFAULT_MAX_WORKERS
+worker_count = 0
+
+ACTIVE_STATES = ('extracting', 'downloading', 'post-processing')
+FINAL_STATES = ('done', 'failed', 'cancelled', 'skipped')
+
+def create_job(link, download_type, folder, title=None, parent=None, ie_key=None, info=None,
+               playlist=False, journal_key=None, subscription=None, audio_name=None):
+    """Create a new job record and put it at the end of the queue.
+    
+    Playlist jobs are not queued; their entries are enumerated by
+    enumerate_playlist and queued as child jobs (with `parent` set).
+    `info` is an already extracted info dict to download instead of `link`.
+    `journal_key` is given for jobs replayed from the journal, which already
+    holds their submission. `subscription` is the id of the subscription a
+    playlist job checks for new entries. `audio_name` overrides the current
+    audio format (e.g. the one chosen by a daemon client).
+    """
+    global job_counter
+    with queue_cond:
+        job_counter += 1
+        job = {
+            'id': job_counter,
+            'url': link,
+            'type': download_type,
+            'audio_format': jobs[parent]['audio_format'] if parent else audio_name or audio_format,
+            'folder': folder,
+            'title': title or link,
+            'parent': parent,
+            'ie_key': ie_key,
+            'info': info,
+            'playlist': playlist,
+            'subscription': subscription,
+            'state': 'queued',
+            'progress': 0.0,
+            'speed': None,
+            'eta': None,
+            'status_text': "",
+            'error': None,
+            'error_kind': None,
+            'format_id': None,
+            'site': None,
+            'fragments': None,
+            'fragmented': False,
+            'priority': 'low' if parent else 'normal',
+            'bw_counted': None,
+            'filename': None,
+            'output_name': None,
+            'output_suffix': None,
+            'output_suffixes': {},      # entry id -> suffix of every entry the job named
+            'journal_key': journal_key or os.urandom(6).hex(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'timings': {},
+            'phase_started': time.monotonic(),
+            'bytes': 0,
+            'peak_speed': 0,
+            'retries': 0,
+            'throttled': 0,
+            'fallbacks': 0,
+            'ydl_params': None,
+            'downloaded': False,
+            'pp_pending': 0,
+            'ended': False,
+            'version': 0,
+            'cancel': threading.Event(),
+        }
+        if playlist:
+            job['state'] = 'extracting'
+            job['entries'] = 0
+            job['skipped'] = 0
+            job['finished'] = 0
+            job['enumerated'] = False
+            job['new_entries'] = []     # (entry id, child job id) found by a subscription check
+        else:
+            job_queue.append(job['id'])
+            queue_cond.notify_all()
+        jobs[job['id']] = job
+    if journal_key is None:
+        journal_write('submit', job, url=link, type=download_type, audio_format=job['audio_format'],
+                      folder=folder, title=title, ie_key=ie_key, playlist=playlist,
+                      parent=jobs[parent]['journal_key'] if parent else None, subscription=subscription)
+    notify_job_changed(job)
+    return job
+
+def cancel_job(job_id):
+    """Cancel a job. Queued jobs are dropped, running jobs abort on their next progress callback."""
+    with queue_cond:
+        job = jobs.get(job_id)
+        if job is None or job['ended']:
+            return
+        job['cancel'].set()
+        was_queued = job_id in job_queue
+        if was_queued:
+            job_queue.remove(job_id)
+        children = [child for child in jobs.values() if child['parent'] == job_id]
+    if job['playlist']:
+        # Stops enumeration and every entry of the playlist that has not finished
+        for child in children:
+            cancel_job(child['id'])
+        end_job(job, 'cancelled')
+    elif was_queued:
+        end_job(job, 'cancelled')
+
+def move_job(job_id, offset):
+    """Swap a queued job with its neighbour above (offset -1) or below (offset 1).
+    
+    Returns the id of the job it was swapped with, or None if it could not move.
+    """
+    with queue_cond:
+        if job_id not in job_queue:
+            return None
+        index = job_queue.index(job_id)
+        new_index = index + offset
+        if not 0 <= new_index < len(job_queue):
+            return None
+        job_queue[index], job_queue[new_index] = job_queue[new_index], job_queue[index]
+        return job_queue[index]
+
+def set_max_workers(count):
+    """Change the size of the worker pool; extra workers exit once their current job ends."""
+    global max_workers
+    with queue_cond:
+        max_workers = max(1, min(MAX_WORKERS_LIMIT, int(count)))
+        queue_cond.notify_all()
+    ensure_workers()
+
+def ensure_workers():
+    """Start worker threads until the pool has `max_workers` of them."""
+    global worker_count
+    with queue_cond:
+        while worker_count < max_workers:
+            worker_count += 1
+            worker = threading.Thread(target=worker_loop)
+            worker.daemon = True
+            worker.start()
+
+def worker_loop():
+    """Take jobs from the queue and download them until the pool shrinks."""
+    global worker_count
+    engine_ready.wait()
+    while True:
+        with queue_cond:
+            while True:
+                if worker_count > max_workers:
+                    worker_count -= 1
+                    return
+                index, wait = next_runnable_job()
+                if index is not None:
+                    break
+                # Nothing to do, or every queued job belongs to a paused site
+                queue_cond.wait(wait)
+            job = jobs[job_queue.pop(index)]
+            circuit_claim_probe(job)
+            track_phase(job)
+            job['state'] = 'extracting'
+            job['status_text'] = ""
+            # Wake up playlist enumerators waiting for room in the queue
+            queue_cond.notify_all()
+        try:
+            journal_write('state', job, state='extracting')
+            notify_job_changed(job)
+            run_download(job)
+        except Exception as e:
+            # A job that breaks the worker ends as failed; the worker goes on with the next one
+            end_job(job, 'failed', str(e).split('\n')[0] or type(e).__name__)
+        circuit_release_probe(job)
+
+# Circuit breaker
+# Rate limiting (HTTP 429), bot checks and blocks (repeated HTTP 403, see
+# circuit_forbidden) are counted per site. After
+# CIRCUIT_THRESHOLD of them in a row the site's circuit opens: its queued jobs
+# wait for a cooldown (doubled on every trip) while jobs of other sites go on,
+# and rate-limited running jobs go back to the queue instead of failing. When
+# the cooldown is over, one probe job is let through; if it gets through the
+# circuit closes, if it is throttled again the circuit reopens. The state is
+# guarded by queue_cond, like the queue itself.
+circuits = {}   # site -> {'failures', 'forbidden', 'open_until' (None = closed), 'cooldown', 'probe'}
+
+def circuit_key(job):
+    """Site of a job for the circuit breaker: the host of its link (or its extractor)."""
+    host = urlparse(job['url']).hostname
+    if host:
+        return host.removeprefix('www.').removeprefix('m.')
+    return (job['ie_key'] or 'generic').lower()
+
+def next_runnable_job():
+    """Index of the next queued job whose site is not paused (called with queue_cond held).
+    
+    Returns (index, None), or (None, seconds until the next paused site may be
+    tried again); the wait is None if there is no such site.
+    """
+    if not job_queue:
+        return None, None
+    if not circuits:
+        return 0, None
+    now = time.monotonic()
+    wait = None
+    for index, job_id in enumerate(job_queue):
+        job = jobs[job_id]
+        site = circuit_key(job)
+        circuit = circuits.get(site)
+        if circuit is None or circuit['open_until'] is None:
+            return index, None
+        if now >= circuit['open_until']:
+            if circuit['probe'] is None:
+                return index, None
+            # Only the probe job may run; it wakes the workers when it ends
+            continue
+        remaining = circuit['open_until'] - now
+        wait = remaining if wait is None else min(wait, remaining)
+        if not job['status_text']:
+            job['status_text'] = f"Paused: {site} is rate limiting"
+            notify_job_changed(job)
+    return None, wait
+
+def circuit_claim_probe(job):
+    """Make a job the probe of its site's circuit if the cooldown is over (queue_cond held)."""
+    if not circuits:
+        return
+    circuit = circuits.get(circuit_key(job))
+    if circuit is not None and circuit['open_until'] is not None and circuit['probe'] is None:
+        circuit['probe'] = job['id']
+
+def circuit_release_probe(job):
+    """Let the next job probe the site if this job was the probe and ended undecided."""
+    with queue_cond:
+        circuit = circuits.get(circuit_key(job)) if circuits else None
+        if circuit is not None and circuit['probe'] == job['id']:
+            circuit['probe'] = None
+            queue_cond.notify_all()
+
+def circuit_failure(job, trip=False):
+    """Count a rate-limited attempt of a job against its site.
+    
+    Returns the seconds until the site may be tried again if its circuit is
+    open now, or 0 if it stays closed. `trip` opens it right away.
+    """
+    site = circuit_key(job)
+    now = time.monotonic()
+    with queue_cond:
+        circuit = circuits.setdefault(site, new_circuit())
+        circuit['failures'] += 1
+        if circuit['open_until'] is not None and now < circuit['open_until']:
+            # Already paused by another job of the site
+            return circuit['open_until'] - now
+        was_probe = circuit['probe'] == job['id']
+        circuit['probe'] = None
+        if not (trip or was_probe or circuit['open_until'] is not None
+                or circuit['failures'] >= CIRCUIT_THRESHOLD):
+            return 0
+        circuit['cooldown'] = min(CIRCUIT_MAX_COOLDOWN, circuit['cooldown'] * 2 or CIRCUIT_COOLDOWN)
+        circuit['open_until'] = now + circuit['cooldown']
+        cooldown = circuit['cooldown']
+        # Wake the workers, so they stop waiting on the paused site and pick other jobs
+        queue_cond.notify_all()
+    with telemetry_lock:
+        count_metric('ytdlp_gui_circuit_trips_total', [('site', site)])
+    report_message('site_throttled', site=site, cooldown=cooldown)
+    return cooldown
+
+def new_circuit():
+    """State of a site that has not been throttled so far."""
+    return {'failures': 0, 'forbidden': 0, 'open_until': None, 'cooldown': 0, 'probe': None}
+
+def circuit_forbidden(job):
+    """Count an HTTP 403 of a job against its site; True if the site is blocking us.
+    
+    The count starts over once a download of the site gets through.
+    """
+    with queue_cond:
+        circuit = circuits.setdefault(circuit_key(job), new_circuit())
+        circuit['forbidden'] += 1
+        return circuit['failures'] > 0 or circuit['forbidden'] >= FORBIDDEN_THRESHOLD
+
+def circuit_success(job):
+    """Close the circuit of a job's site after a download got through."""
+    if not circuits:
+        return
+    site = circuit_key(job)
+    with queue_cond:
+        if circuits.pop(site, None) is None:
+            return
+        paused = [jobs[job_id] for job_id in job_queue
+                  if jobs[job_id]['status_text'] and circuit_key(jobs[job_id]) == site]
+        for paused_job in paused:
+            paused_job['status_text'] = ""
+        queue_cond.notify_all()
+    for paused_job in paused:
+        notify_job_changed(paused_job)
+
+def requeue_job(job, status_text):
+    """Put a started job back at the front of the queue, e.g. while its site is paused."""
+    release_disk_space(job)
+    with queue_cond:
+        if job['cancel'].is_set():
+            cancelled = True
+        else:
+            cancelled = False
+            track_phase(job)
+            job['state'] = 'queued'
+            job['status_text'] = status_text
+            job['speed'] = job['eta'] = None
+            job_queue.insert(0, job['id'])
+            queue_cond.notify_all()
+    if cancelled:
+        end_job(job, 'cancelled')
+        return
+    journal_write('state', job, state='queued')
+    notify_job_changed(job)
+
+# Job journal
+# Append-only JSON lines next to config.json: every submitted job, its state
+# changes, the files it writes and how it ended. open_journal replays it at
+# startup, so jobs that never ended (queued, or killed mid-transfer by closing
+# the window or a crash) are queued again; they keep their format and output
+# name, so yt-dlp continues their .part files. Only one process (the GUI
+# or the daemon) holds the journal; command line runs do not write one.
+journal_lock = threading.Lock()
+journal_file = None
+journal_lock_file = None
+
+def journal_write(op, job, **fields):
+    """Append one record about a job to the journal (no-op while it is not open)."""
+    if journal_file is None:
+        return
+    line = json.dumps({'op': op, 'key': job['journal_key'], **fields}) + "\n"
+    with journal_lock:
+        try:
+            journal_file.write(line)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        except (OSError, ValueError):
+            pass
+
+def read_journal(path):
+    """Fold the journal into the top-level jobs that have not ended, in submission order.
+    
+    Returns {key: [records to keep]}: the submission plus the last state and
+    output records. Playlist entries are not kept; the playlist is enumerated
+    again and the archive skips the entries that finished.
+    """
+    pending = {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                key = record.get('key')
+                if record.get('op') == 'submit':
+                    if record.get('parent') is None:
+                        pending[key] = {'submit': record}
+                elif key in pending:
+                    if record.get('op') == 'end':
+                        del pending[key]
+                    else:
+                        pending[key][record.get('op')] = record
+    except OSError:
+        pass
+    return {key: list(records.values()) for key, records in pending.items()}
+
+def open_journal():
+    """Take the journal, queue the jobs it left unfinished and start journaling.
+    
+    Returns the replayed jobs, or None if another process (e.g. a running
+    daemon) already holds the journal.
+    """
+    global journal_file, journal_lock_file
+    if journal_file is not None:
+        return []
+    path = get_journal_path()
+    try:
+        lock_file = open(path + ".lock", 'w')
+    except OSError:
+        return None
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    journal_lock_file = lock_file
+    
+    pending = read_journal(path)
+    # Compact: keep only what is needed to resume, replaced atomically
+    try:
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            for records in pending.values():
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        journal_file = open(path, 'a', encoding='utf-8')
+    except OSError:
+        return []
+    
+    replayed = []
+    with queue_cond:
+        # Workers cannot take a replayed job before its saved fields are restored
+        for key, records in pending.items():
+            submit = records[0]
+            last = {record['op']: record for record in records}
+            output = last.get('output', {})
+            job = create_job(submit['url'], submit['type'], submit['folder'],
+                             title=output.get('title') or submit.get('title'), ie_key=submit.get('ie_key'),
+                             playlist=submit.get('playlist', False), journal_key=key,
+                             subscription=submit.get('subscription'))
+            job['audio_format'] = submit.get('audio_format', job['audio_format'])
+            job['format_id'] = output.get('format')
+            job['filename'] = output.get('path')
+            job['output_suffix'] = output.get('suffix')
+            replayed.append(job)
+    for job in replayed:
+        if job['playlist']:
+            start_enumeration(job)
+    ensure_workers()
+    return replayed
+
+def record_job_output(job, path):
+    """Remember the file a job is writing (or has written) and journal it."""
+    if path and path != job['filename']:
+        job['filename'] = path
+        journal_write('output', job, path=path, format=job['format_id'], title=job['title'],
+                      suffix=job['output_suffix'])
+
+# Adaptive fragment concurrency
+# `fragment_levels` remembers per site how many parallel fragments worked best
+# so far; `fragment_allocations` holds what every running job was granted.
+fragment_lock = threading.Lock()
+fragment_cap = DEFAULT_FRAGMENT_CAP
+fragment_levels = {}
+fragment_allocations = {}
+
+def set_fragment_cap(cap):
+    """Change the global limit of parallel fragments shared by all running jobs."""
+    global fragment_cap
+    with fragment_lock:
+        fragment_cap = max(1, min(FRAGMENT_CAP_LIMIT, int(cap)))
+
+def get_site_key(info, link):
+    """Key used to learn fragment concurrency: the extractor, or the host of the link."""
+    if info and info.get('extractor_key'):
+        return info['extractor_key'].lower()
+    return urlparse(link).hostname or link
+
+def acquire_fragments(job):
+    """Grant a job its share of parallel fragments for the next download.
+    
+    At least one, even if the other running jobs already use up the cap.
+    """
+    with fragment_lock:
+        level = fragment_levels.get(job['site'], {}).get('level', INITIAL_FRAGMENTS)
+        others = sum(count for job_id, count in fragment_allocations.items() if job_id != job['id'])
+        granted = max(1, min(level, fragment_cap - others))
+        fragment_allocations[job['id']] = granted
+    job['fragments'] = granted
+    return granted
+
+def release_fragments(job):
+    """Give a job's fragments back to the shared budget."""
+    with fragment_lock:
+        fragment_allocations.pop(job['id'], None)
+
+def report_fragment_rate(job, rate):
+    """Feed the throughput of a finished fragmented download into its site's level.
+    
+    Simple hill climbing: if more fragments gave clearly more throughput than
+    the last measurement, try one more next time; if throughput dropped, back off.
+    """
+    with fragment_lock:
+        state = fragment_levels.setdefault(job['site'], {'level': INITIAL_FRAGMENTS, 'rate': 0})
+        used = job['fragments'] or 1
+        if rate > state['rate'] * 1.1:
+            state['level'] = min(fragment_cap, used + 1)
+        elif rate < state['rate'] * 0.9:
+            state['level'] = max(1, used - 1)
+        state['rate'] = rate
+
+# Bandwidth scheduler
+# One token bucket for all running jobs. progress_hook charges every downloaded
+# block to it; once the budget is used up the job sleeps for a time that is
+# inversely proportional to its share of the weights of all running jobs, so
+# higher priorities get more of the pipe while unused budget goes to whoever
+# is still pulling. Schedule windows override the limit at certain times of day.
+bandwidth_lock = threading.Lock()
+bandwidth_limit = DEFAULT_BANDWIDTH_LIMIT
+bandwidth_schedule = []
+bandwidth_weights = {}
+bandwidth_tokens = 0.0
+bandwidth_updated = time.monotonic()
+
+def parse_clock(text):
+    """Turn "HH:MM" into minutes after midnight."""
+    hours, minutes = text.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def set_bandwidth_limit(limit_kb):
+    """Change the default bandwidth limit (KiB/s, 0 = unlimited)."""
+    global bandwidth_limit
+    with bandwidth_lock:
+        bandwidth_limit = max(0, min(BANDWIDTH_LIMIT_MAX, int(limit_kb)))
+
+def set_bandwidth_schedule(windows):
+    """Set time windows like {"start": "09:00", "end": "18:00", "limit_kb": 500}.
+    
+    A window whose end is before its start runs over midnight. Invalid
+    windows are ignored.
+    """
+    global bandwidth_schedule
+    schedule = []
+    for window in windows or []:
+        try:
+            schedule.append((parse_clock(window['start']), parse_clock(window['end']),
+                             max(0, int(window.get('limit_kb', 0)))))
+        except (KeyError, ValueError, TypeError, AttributeError):
+            continue
+    with bandwidth_lock:
+        bandwidth_schedule = schedule
+
+def current_bandwidth_limit():
+    """Limit in KiB/s that applies right now (the first matching window wins)."""
+    now = datetime.now()
+    minute = now.hour * 60 + now.minute
+    for start, end, limit_kb in bandwidth_schedule:
+        if start <= end:
+            if start <= minute < end:
+                return limit_kb
+        elif minute >= start or minute < end:
+            return limit_kb
+    return bandwidth_limit
+
+def bandwidth_register(job):
+    """Count a job that starts downloading towards the shared budget."""
+    with bandwidth_lock:
+        bandwidth_weights[job['id']] = PRIORITY_WEIGHTS[job['priority']]
+
+def bandwidth_unregister(job):
+    """Remove a job that stopped downloading from the shared budget."""
+    with bandwidth_lock:
+        bandwidth_weights.pop(job['id'], None)
+
+def throttle_download(job, downloaded_bytes):
+    """Count newly downloaded bytes and charge them to the budget; wait if it is used up."""
+    global bandwidth_tokens, bandwidth_updated
+    with bandwidth_lock:
+        counted = job['bw_counted']
+        job['bw_counted'] = downloaded_bytes
+        # First block of a download (or a new stream of the same job)
+        if counted is None or downloaded_bytes <= counted:
+            return
+        needed = downloaded_bytes - counted
+        job['bytes'] += needed
+        limit = current_bandwidth_limit() * 1024
+        if not limit:
+            return
+        now = time.monotonic()
+        bandwidth_tokens = min(limit * BANDWIDTH_BURST,
+                               bandwidth_tokens + (now - bandwidth_updated) * limit)
+        bandwidth_updated = now
+        missing = needed - max(bandwidth_tokens, 0)
+        bandwidth_tokens -= needed
+        if missing <= 0:
+            return
+        share = bandwidth_weights.get(job['id'], 1) / (sum(bandwidth_weights.values()) or 1)
+        delay = missing / (limit * share)
+    # Returns early when the job is cancelled
+    job['cancel'].wait(delay)
+
+def prioritize_job(job_id):
+    """Give a job high priority and move it to the front of the queue.
+    
+    Returns the id of the job that was first in the queue before, or None
+    if the job was not waiting in the queue.
+    """
+    with queue_cond:
+        job = jobs.get(job_id)
+        if job is None or job['playlist'] or job['ended']:
+            return None
+        job['priority'] = 'high'
+        previous_first = None
+        if job_id in job_queue and job_queue[0] != job_id:
+            previous_first = job_queue[0]
+            job_queue.remove(job_id)
+            job_queue.insert(0, job_id)
+    with bandwidth_lock:
+        if job_id in bandwidth_weights:
+            bandwidth_weights[job_id] = PRIORITY_WEIGHTS['high']
+    notify_job_changed(job)
+    return previous_first
+
+# Telemetry
+# Every job keeps the time spent per state ('queued', 'extracting',
+# 'downloading', 'post-processing') in job['timings']. When it ends, a JSON
+# line is appended to telemetry.jsonl and the aggregate metrics are updated.
+telemetry_lock = threading.Lock()
+metrics_counters = {}
+metrics_histograms = {}
+
+def track_phase(job):
+    """Add the time since the last state change to the job's current state."""
+    now = time.monotonic()
+    timings = job['timings']
+    timings[job['state']] = timings.get(job['state'], 0) + now - job['phase_started']
+    job['phase_started'] = now
+
+def count_metric(name, labels=(), value=1):
+    """Increase a counter; labels are (name, value) pairs."""
+    key = (name, tuple(labels))
+    metrics_counters[key] = metrics_counters.get(key, 0) + value
+
+def observe_metric(name, buckets, value, labels=()):
+    """Add an observation to a histogram."""
+    key = (name, tuple(labels))
+    histogram = metrics_histograms.setdefault(key, {'buckets': buckets, 'counts': [0] * len(buckets),
+                                                    'sum': 0, 'count': 0})
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            histogram['counts'][index] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+def record_job_telemetry(job):
+    """Log a finished download job and add it to the metrics."""
+    if job['playlist']:
+        return
+    timings = {phase: round(seconds, 3) for phase, seconds in job['timings'].items()}
+    download_time = job['timings'].get('downloading', 0)
+    avg_speed = job['bytes'] / download_time if download_time and job['bytes'] else None
+    record = {
+        'created': job['created'],
+        'finished': datetime.now().isoformat(timespec='seconds'),
+        'url': job['url'],
+        'site': job['site'],
+        'type': job['type'],
+        'state': job['state'],
+        'error_kind': job['error_kind'],
+        'format': job['format_id'],
+        'fragments': job['fragments'],
+        'bytes': job['bytes'],
+        'avg_speed': round(avg_speed) if avg_speed else None,
+        'peak_speed': round(job['peak_speed']) or None,
+        'retries': job['retries'],
+        'fallbacks': job['fallbacks'],
+        'timings': timings,
+    }
+    with telemetry_lock:
+        count_metric('ytdlp_gui_jobs_total', [('state', job['state'])])
+        count_metric('ytdlp_gui_downloaded_bytes_total', value=job['bytes'])
+        count_metric('ytdlp_gui_retries_total', value=job['retries'])
+        count_metric('ytdlp_gui_format_fallbacks_total', value=job['fallbacks'])
+        for phase, seconds in job['timings'].items():
+            observe_metric('ytdlp_gui_phase_seconds', PHASE_BUCKETS, seconds, [('phase', phase)])
+        if avg_speed:
+            observe_metric('ytdlp_gui_download_speed_bytes', SPEED_BUCKETS, avg_speed,
+                           [('site', job['site'] or '')])
+        try:
+            with open(get_telemetry_path(), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
+
+def format_label_value(value):
+    """A label value escaped for the exposition format (backslash, double quote, newline)."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(labels):
+    """Prometheus label set, e.g. {state="done"}."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{format_label_value(value)}"' for name, value in labels) + "}"
+
+def render_metrics():
+    """Current metrics in the Prometheus text exposition format."""
+    lines = []
+    with queue_cond:
+        states = [job['state'] for job in jobs.values() if not job['playlist']]
+    lines.append("# TYPE ytdlp_gui_jobs gauge")
+    for state in ('queued', *ACTIVE_STATES):
+        lines.append(f"ytdlp_gui_jobs{format_labels([('state', state)])} {states.count(state)}")
+    with telemetry_lock:
+        typed = set()
+        for (name, labels), value in sorted(metrics_counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(metrics_histograms.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            for bound, count in zip(histogram['buckets'], histogram['counts']):
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', bound),))} {count}")
+            lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"{name}_sum{format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{format_labels(labels)} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+class ApiHandler(http.server.BaseHTTPRequestHandler):
+    """Serves /metrics and, when the server has jobs_api set (daemon mode), the job API:
+    
+    GET  /jobs?since=N            jobs that changed after version N
+    POST /jobs                    {"urls": [...], "type": "video", "audio_format": "mp3",
+                                   "folder": "...", "playlist": false}
+    POST /jobs/<id>/cancel        likewise /prioritize and /move?offset=-1
+    
+    Job API requests need the API_TOKEN_HEADER and must not come from a web
+    page (no Origin header); new jobs must be sent as application/json.
+    """
+    
+    def authorized(self):
+        """Whether a job API request comes from a local client that knows the token."""
+        if self.headers.get('Origin') is not None or self.server.api_token is None:
+            return False
+        token = self.headers.get(API_TOKEN_HEADER) or ''
+        return hmac.compare_digest(token.encode('utf-8'), self.server.api_token.encode('utf-8'))
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/metrics':
+            self.send_body(render_metrics(), 'text/plain; version=0.0.4')
+        elif url.path == '/jobs' and self.server.jobs_api:
+            if not self.authorized():
+                self.send_error(403)
+                return
+            try:
+                since = int(parse_qs(url.query).get('since', ['0'])[0])
+            except ValueError:
+                self.send_error(400)
+                return
+            self.send_json(jobs_since(since))
+        else:
+            self.send_error(404)
+    
+    def do_POST(self):
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        if not self.server.jobs_api or parts[0] != 'jobs':
+            self.send_error(404)
+            return
+        if not self.authorized():
+            self.send_error(403)
+            return
+        try:
+            if len(parts) == 1:
+                if self.headers.get_content_type() != 'application/json':
+                    self.send_error(415)
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                download_type = request.get('type', 'video')
+                folder = request.get('folder') or self.server.default_folder
+                audio_name = request.get('audio_format')
+                if download_type not in DOWNLOAD_TYPES or not folder:
+                    raise ValueError("need a folder and type 'video', 'audio' or 'both'")
+                if audio_name is not None and audio_name not in AUDIO_FORMATS:
+                    raise ValueError("unknown audio format")
+                ids = [submit_job(link, download_type, folder, request.get('playlist', False), audio_name)['id']
+                       for link in request['urls']]
+                self.send_json({'ids': ids})
+            elif len(parts) == 3 and parts[2] == 'cancel':
+                cancel_job(int(parts[1]))
+                self.send_json({})
+            elif len(parts) == 3 and parts[2] == 'prioritize':
+                self.send_json({'previous_first': prioritize_job(int(parts[1]))})
+            elif len(parts) == 3 and parts[2] == 'move':
+                offset = int(parse_qs(url.query).get('offset', ['1'])[0])
+                self.send_json({'swapped_with': move_job(int(parts[1]), offset)})
+            else:
+                self.send_error(404)
+        except (KeyError, ValueError, TypeError) as e:
+            self.send_error(400, str(e))
+    
+    def send_json(self, data):
+        self.send_body(json.dumps(data), 'application/json')
+    
+    def send_body(self, text, content_type):
+        body = text.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_api_server(port, jobs_api=False, default_folder=None):
+    """Serve metrics (and the job API) on localhost in a background thread.
+    
+    Returns the server, or None if the port could not be opened.
+    """
+    try:
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', port), ApiHandler)
+    except OSError as e:
+        report_message('api_disabled', port=port, error=e)
+        return None
+    server.daemon_threads = True
+    server.jobs_api = jobs_api
+    server.api_token = get_api_token() if jobs_api else None
+    server.default_folder = default_folder
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def set_job_state(job, state, progress=None, status_text=None):
+    """Update a job's state/progress and schedule a redraw of its row."""
+    if job['ended']:
+        # Final states are only set through end_job
+        return
+    if state != job['state']:
+        track_phase(job)
+        journal_write('state', job, state=state)
+    job['state'] = state
+    if progress is not None:
+        job['progress'] = progress
+    if status_text is not None:
+        job['status_text'] = status_text
+    notify_job_changed(job)
+
+def end_job(job, state, error=None):
+    """Move a job into a final state exactly once and count it towards its playlist.
+    
+    The download and post-processing stages may both try to end a job;
+    only the first call has an effect.
+    """
+    with queue_cond:
+        if job['ended']:
+            return False
+        job['ended'] = True
+        track_phase(job)
+        job['state'] = state
+        job['status_text'] = ""
+        if error is not None:
+            job['error'] = error
+        if state in ('done', 'skipped'):
+            job['progress'] = 100
+        # Finished jobs stay listed for the whole session; without the extracted
+        # info dict even thousands of them take little memory
+        job['info'] = None
+    release_disk_space(job)
+    release_output_name(job)
+    journal_write('end', job, state=state, error=job['error'], path=job['filename'])
+    notify_job_changed(job)
+    record_job_telemetry(job)
+    child_finished(job)
+    if job['subscription'] is not None:
+        finish_subscription_poll(job)
+    return True
+
+def child_finished(job):
+    """Count a finished playlist entry towards its playlist job's progress."""
+    if job['parent'] is None:
+        return
+    parent = jobs[job['parent']]
+    with queue_cond:
+        parent['finished'] += 1
+        all_finished = parent['enumerated'] and parent['finished'] >= parent['entries']
+    if all_finished:
+        end_job(parent, 'done')
+    else:
+        progress = parent['finished'] / parent['entries'] * 100 if parent['entries'] else 0
+        set_job_state(parent, parent['state'], progress)
+
+def notify_job_changed(job):
+    """Mark a job as changed and tell the listeners. Safe to call from any thread."""
+    job['version'] = next(job_versions)
+    for listener in job_listeners:
+        listener(job)
+
+def report_message(key, **fields):
+    """Pass an engine notice (a key of MESSAGES) to the message listeners. Safe to call from any thread."""
+    for listener in message_listeners:
+        listener(key, fields)
+
+def format_speed(speed):
+    """Format a speed in bytes per second for display."""
+    if speed > 1024 * 1024:
+        return f"{speed / (1024 * 1024):.2f} MiB/s"
+    elif speed > 1024:
+        return f"{speed / 1024:.2f} KiB/s"
+    return f"{speed:.2f} B/s"
+
+def format_size(size):
+    """Format a size in bytes for display."""
+    if size >= 1024 ** 3:
+        return f"{size / 1024 ** 3:.2f} GiB"
+    elif size >= 1024 ** 2:
+        return f"{size / 1024 ** 2:.1f} MiB"
+    return f"{size / 1024:.0f} KiB"
+
+def record_selected_format(job, info):
+    """Remember the format yt-dlp selected, so a network retry can resume exactly
+    it and a format fallback knows which format ids failed."""
+    if info.get('requested_formats'):
+        job['format_id'] = '+'.join(f['format_id'] for f in info['requested_formats'])
+    elif info.get('format_id'):
+        job['format_id'] = info['format_id']
+
+def progress_hook(job, d):
+    """Progress hook for yt-dlp, bound to a single job.
+    
+    Runs on the download thread, so it only records raw numbers on the job;
+    formatting and widget updates are left to the job listeners.
+    """
+    if job['cancel'].is_set():
+        raise yt_dlp.utils.DownloadCancelled("Cancelled by user")
+    
+    info = d.get('info_dict') or {}
+    if job['title'] == job['url'] and info.get('title'):
+        job['title'] = info['title']
+    
+    record_selected_format(job, info)
+    record_job_output(job, d.get('filename'))
+    
+    if d['status'] == 'downloading':
+        try:
+            # Get percentage
+            if d.get('total_bytes'):
+                percentage = (d['downloaded_bytes'] / d['total_bytes']) * 100
+            elif d.get('total_bytes_estimate'):
+                percentage = (d['downloaded_bytes'] / d['total_bytes_estimate']) * 100
+            else:
+                percentage = 0
+            
+            throttle_download(job, d['downloaded_bytes'])
+            job['speed'] = d.get('speed')
+            job['eta'] = d.get('eta')
+            job['peak_speed'] = max(job['peak_speed'], job['speed'] or 0)
+            if d.get('fragment_count') and not job['fragmented']:
+                job['fragmented'] = True
+            elif not d.get('fragment_count') and job['fragments'] and not job['fragmented']:
+                # Progressive download: a single connection, the fragments are not used
+                release_fragments(job)
+                job['fragments'] = None
+            set_job_state(job, 'downloading', percentage)
+            
+        except Exception as e:
+            pass
+    
+    elif d['status'] == 'finished':
+        if job['fragmented'] and d.get('elapsed') and d.get('total_bytes'):
+            # Tune the site's level and apply it to the next download of this job
+            # (e.g. the audio stream after the video stream); yt-dlp sizes the
+            # fragment thread pool when a download starts
+            report_fragment_rate(job, d['total_bytes'] / d['elapsed'])
+            if job['ydl_params'] is not None:
+                job['ydl_params']['concurrent_fragment_downloads'] = acquire_fragments(job)
+            job['fragmented'] = False
+        set_job_state(job, 'post-processing', 100, "Finalizing...")
+
+def postprocessor_hook(job, d):
+    """Postprocessor hook for yt-dlp, marks the job as post-processing while ffmpeg runs."""
+    if d['status'] == 'started':
+        set_job_state(job, 'post-processing', status_text=d.get('postprocessor', ""))
+
+def base_ydl_opts():
+    """Options shared by every YoutubeDL instance the app creates."""
+    ydl_opts = {
+        'nocheckcertificate': True,
+        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'extractor_args': {'youtube': {'player_client': ['android', 'web']}},
+        'cookiefile': None,
+        'http_headers': {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-us,en;q=0.5',
+            'Sec-Fetch-Mode': 'navigate',
+        }
+    }
+    
+    if quiet:
+        ydl_opts['quiet'] = True
+        ydl_opts['noprogress'] = True
+    
+    # Add ffmpeg location if found
+    ffmpeg_location = get_ffmpeg_path()
+    if ffmpeg_location:
+        ydl_opts['ffmpeg_location'] = ffmpeg_location
+    
+    # Add cookies if file exists (helps with bot detection)
+    cookies_file = get_cookies_path()
+    if os.path.exists(cookies_file):
+        ydl_opts['cookiefile'] = cookies_file
+    
+    return ydl_opts
+
+def iter_playlist_entries(entries):
+    """Yield playlist entries one at a time without resolving the whole list first."""
+    if isinstance(entries, yt_dlp.utils.PagedList):
+        # Paged lists (some extractors) are fetched page by page
+        start = 0
+        while True:
+            page = entries.getslice(start, start + entries._pagesize)
+            if not page:
+                return
+            yield from page
+            start += len(page)
+    else:
+        # Lists and generators; YouTube channels/playlists return generators
+        yield from entries
+
+def submit_job(link, download_type, folder, playlist=False, audio_name=None):
+    """Queue a link, or start enumerating a playlist/channel into the queue."""
+    job = create_job(link, download_type, folder, playlist=playlist, audio_name=audio_name)
+    if playlist:
+        start_enumeration(job)
+    ensure_workers()
+    return job
+
+def start_enumeration(job):
+    """Enumerate a playlist job's entries on a background thread."""
+    enumerator = threading.Thread(target=enumerate_playlist, args=(job,))
+    enumerator.daemon = True
+    enumerator.start()
+
+# Job fields that are shown to API clients (everything but internal state)
+JOB_SNAPSHOT_FIELDS = ('id', 'url', 'type', 'audio_format', 'folder', 'title', 'parent', 'playlist',
+                       'state', 'progress', 'speed', 'eta', 'status_text', 'error', 'error_kind',
+                       'format_id', 'site', 'fragments', 'fragmented', 'priority', 'ended',
+                       'entries', 'skipped', 'finished', 'version')
+
+def job_snapshot(job):
+    """JSON-safe copy of the public fields of a job."""
+    return {key: job[key] for key in JOB_SNAPSHOT_FIELDS if key in job}
+
+def jobs_since(version):
+    """Snapshots of the jobs that changed after `version`, and the newest version."""
+    with queue_cond:
+        changed = [job_snapshot(job) for job in jobs.values() if job['version'] > version]
+    newest = max([version] + [job['version'] for job in changed])
+    return {'version': newest, 'jobs': changed}
+
+def enumerate_playlist(job):
+    """Resolve a playlist/channel lazily and queue its entries as they are found.
+    
+    Uses flat extraction, so each entry costs no extra requests until a worker
+    downloads it. Enumeration pauses while PLAYLIST_LOOKAHEAD entries of this
+    playlist are still waiting in the queue, so the first entries download
+    while the rest of a large channel is still being resolved.
+    """
+    engine_ready.wait()
+    ydl_opts = base_ydl_opts()
+    ydl_opts.update({
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+        'quiet': True,
+    })
+    
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(job['url'], download=False, process=False)
+            # Channel URLs often redirect to a tab (e.g. /videos) first
+            while info.get('_type') in ('url', 'url_transparent'):
+                info = ydl.extract_info(info['url'], download=False, process=False,
+                                        ie_key=info.get('ie_key'))
+            
+            if info.get('title'):
+                job['title'] = info['title']
+            
+            if info.get('_type') not in ('playlist', 'multi_video'):
+                # Not a playlist after all; download the already extracted video
+                job['entries'] = 1
+                create_job(job['url'], job['type'], job['folder'], title=info.get('title'),
+                           parent=job['id'], info=info)
+                entries = []
+            else:
+                entries = iter_playlist_entries(info['entries'])
+                if job['subscription'] is not None:
+                    entries = subscription_entries(job, info, entries)
+            
+            for entry in entries:
+                if job['cancel'].is_set():
+                    return
+                if not entry:
+                    continue
+                # Skip entries that are already in the archive before any extraction
+                if archive_contains(archive_key_for_info(entry), job['type']):
+                    job['skipped'] += 1
+                    notify_job_changed(job)
+                    continue
+                with queue_cond:
+                    while (not job['cancel'].is_set() and
+                           sum(1 for job_id in job_queue if jobs[job_id]['parent'] == job['id']) >= PLAYLIST_LOOKAHEAD):
+                        queue_cond.wait(1)
+                    job['entries'] += 1
+                if entry.get('_type', 'url') in ('url', 'url_transparent') and entry.get('url'):
+                    child = create_job(entry['url'], job['type'], job['folder'], title=entry.get('title'),
+                                       parent=job['id'], ie_key=entry.get('ie_key'))
+                else:
+                    # Some extractors return fully resolved entries instead of links
+                    ydl.add_default_extra_info(entry, ydl.get_info_extractor(info.get('extractor_key', 'Generic')), job['url'])
+                    child = create_job(entry.get('webpage_url') or job['url'], job['type'], job['folder'],
+                                       title=entry.get('title'), parent=job['id'], info=entry)
+                if job['subscription'] is not None:
+                    job['new_entries'].append((subscription_entry_id(entry), child['id']))
+                notify_job_changed(job)
+                ensure_workers()
+        
+        with queue_cond:
+            job['enumerated'] = True
+            all_finished = job['finished'] >= job['entries']
+        if all_finished:
+            end_job(job, 'done')
+        else:
+            set_job_state(job, 'downloading')
+    
+    except Exception as e:
+        with queue_cond:
+            job['enumerated'] = True
+        end_job(job, 'failed', str(e).split('\n')[0])
+
+# Subscriptions
+# Saved channels and playlists in subscriptions.json, each with its own download
+# type, folder and check interval. A due subscription is checked by a playlist
+# job in subscription mode: lists that show new uploads first (channels) are
+# read only up to the first entry that is already known, which mostly means the
+# first page; lists that append new entries (playlists) are read in full only
+# when their first entry stayed the same but their length grew, and only the
+# entries after the last one of the previous check are new. What a check
+# saw is saved when its job ends, so entries that were interrupted or failed
+# are found again by the next check. The file may be edited by another process
+# (e.g. the GUI while a daemon downloads); changes are picked up by mtime.
+subscriptions_lock = threading.RLock()
+subscriptions = None        # list of subscription dicts, loaded on first use
+subscriptions_mtime = None
+subscription_scheduler = None
+
+def load_subscriptions():
+    """Read subscriptions.json into `subscriptions` if it changed (call with subscriptions_lock)."""
+    global subscriptions, subscriptions_mtime
+    path = get_subscriptions_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    if subscriptions is not None and mtime == subscriptions_mtime:
+        return subscriptions
+    loaded = []
+    if mtime is not None:
+        try:
+            with open(path, encoding='utf-8') as f:
+                loaded = json.load(f).get('subscriptions', [])
+        except (OSError, ValueError, AttributeError):
+            loaded = []
+    # Keep the check results of this process for subscriptions that are still there
+    known = {subscription['id']: subscription for subscription in subscriptions or []}
+    subscriptions = [known[entry['id']] if entry['id'] in known and
+                     (known[entry['id']]['last_checked'] or 0) >= (entry.get('last_checked') or 0)
+                     else entry for entry in loaded]
+    subscriptions_mtime = mtime
+    return subscriptions
+
+def save_subscriptions():
+    """Write `subscriptions` to subscriptions.json atomically (call with subscriptions_lock)."""
+    global subscriptions_mtime
+    path = get_subscriptions_path()
+    try:
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({'subscriptions': subscriptions}, f, indent=2)
+        os.replace(path + ".tmp", path)
+        subscriptions_mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        pass
+
+def list_subscriptions():
+    """Copies of all subscriptions."""
+    with subscriptions_lock:
+        return [dict(subscription) for subscription in load_subscriptions()]
+
+def add_subscription(url, download_type, folder, interval_hours=DEFAULT_SUBSCRIPTION_HOURS, only_new=True):
+    """Subscribe to a channel or playlist; returns the new subscription.
+    
+    With `only_new` the first check only remembers what is already there and
+    later checks download what is added after that; otherwise the first check
+    downloads every entry that is not in the archive yet.
+    """
+    subscription = {
+        'id': os.urandom(6).hex(),
+        'url': url,
+        'title': None,
+        'type': download_type,
+        'audio_format': audio_format,
+        'folder': folder,
+        'interval_hours': interval_hours,
+        'only_new': only_new,
+        'added': datetime.now().isoformat(timespec='seconds'),
+        'last_checked': None,
+        'last_new': 0,
+        'last_error': None,
+        'head': None,           # id of the first entry at the last check
+        'count': None,          # length of the list at the last check, if the site tells
+        'tail': None,           # id of the last entry at the last check that read the whole list
+        'newest_date': None,    # newest upload date seen (YYYYMMDD)
+        'seen': [],             # ids of the newest known entries, newest first
+    }
+    with subscriptions_lock:
+        load_subscriptions().append(subscription)
+        save_subscriptions()
+    return dict(subscription)
+
+def remove_subscription(subscription_id):
+    """Delete a subscription; a check that is already running finishes."""
+    with subscriptions_lock:
+        load_subscriptions()[:] = [subscription for subscription in subscriptions
+                                   if subscription['id'] != subscription_id]
+        save_subscriptions()
+
+def get_subscription(subscription_id):
+    """A copy of a subscription, or None."""
+    with subscriptions_lock:
+        for subscription in load_subscriptions():
+            if subscription['id'] == subscription_id:
+                return dict(subscription)
+    return None
+
+def subscription_entry_id(entry):
+    """Id of a flat playlist entry, as remembered by subscriptions."""
+    return str(entry.get('id') or entry.get('url'))
+
+def entry_upload_date(entry):
+    """Upload date of a flat playlist entry as YYYYMMDD, if the site lists it."""
+    if entry.get('upload_date'):
+        return entry['upload_date']
+    timestamp = entry.get('timestamp') or entry.get('release_timestamp')
+    if timestamp:
+        return time.strftime('%Y%m%d', time.gmtime(timestamp))
+    return None
+
+def subscription_entries(job, info, entries):
+    """Narrow the entries of a subscription check down to the ones not known yet."""
+    subscription = get_subscription(job['subscription']) or {}
+    seen = set(subscription.get('seen', []))
+    first_check = subscription.get('head') is None
+    baseline = first_check and subscription.get('only_new')
+    last_count = subscription.get('count')
+    tail = subscription.get('tail')
+    count = info.get('playlist_count')
+    job['poll'] = {'head': subscription.get('head'), 'count': count, 'tail': tail,
+                   'newest_date': subscription.get('newest_date')}
+    # Lists with new entries first stop at the first known one. Lists that
+    # append new entries are walked in full, and only what comes after the
+    # last entry of the previous check (or past its length) is new.
+    walk_all = first_check
+    appended = False
+    past_tail = False
+    entry_id = None
+    for index, entry in enumerate(entries):
+        if not entry:
+            continue
+        entry_id = subscription_entry_id(entry)
+        date = entry_upload_date(entry)
+        if index == 0:
+            job['poll']['head'] = entry_id
+            if entry_id == subscription.get('head'):
+                if count is None or last_count is None or count <= last_count:
+                    return  # nothing new at either end
+                walk_all = appended = True
+        if date and (job['poll']['newest_date'] is None or date > job['poll']['newest_date']):
+            job['poll']['newest_date'] = date
+        if baseline:
+            # Remember what is there now; only what comes later is downloaded
+            if len(job['new_entries']) < SUBSCRIPTION_SEEN_MAX:
+                job['new_entries'].append((entry_id, None))
+            continue
+        if appended and not past_tail and index < last_count:
+            # Entries up to the last one of the previous check are old
+            past_tail = entry_id == tail
+            continue
+        known = entry_id in seen or archive_contains(archive_key_for_info(entry), job['type'])
+        older = (not walk_all and date and subscription.get('newest_date')
+                 and date < subscription['newest_date'])
+        if known or older:
+            if not walk_all:
+                return
+            job['skipped'] += 1
+            notify_job_changed(job)
+            continue
+        yield entry
+    # The whole list was read
+    job['poll']['tail'] = entry_id
+    if baseline and count is None:
+        job['poll']['count'] = index + 1 if entry_id is not None else 0
+
+def finish_subscription_poll(job):
+    """Save what a subscription check found, once its job and all its entries ended."""
+    poll = job.get('poll')
+    with queue_cond:
+        new_entries = [(entry_id, child_id is None or jobs[child_id]['state'] != 'failed')
+                       for entry_id, child_id in job['new_entries']]
+    with subscriptions_lock:
+        for subscription in load_subscriptions():
+            if subscription['id'] == job['subscription']:
+                break
+        else:
+            return
+        subscription['last_checked'] = time.time()
+        subscription['last_error'] = job['error'] if job['state'] == 'failed' else None
+        if job['state'] == 'done':
+            if job['title'] != job['url']:
+                subscription['title'] = job['title']
+            subscription['last_new'] = sum(1 for _, child_id in job['new_entries'] if child_id is not None)
+            new_ids = [entry_id for entry_id, ok in new_entries if ok]
+            subscription['seen'] = (new_ids + [entry_id for entry_id in subscription['seen']
+                                               if entry_id not in new_ids])[:SUBSCRIPTION_SEEN_MAX]
+            # Failed entries are only found again if the list does not look unchanged
+            if poll is not None and all(ok for _, ok in new_entries):
+                subscription['head'] = poll['head']
+                subscription['count'] = poll['count']
+                subscription['tail'] = poll['tail']
+                subscription['newest_date'] = poll['newest_date']
+        save_subscriptions()
+
+def check_subscription(subscription_id):
+    """Start a check of a subscription now; returns its playlist job, or None."""
+    subscription = get_subscription(subscription_id)
+    if subscription is None:
+        return None
+    with queue_cond:
+        for job in jobs.values():
+            if job['subscription'] == subscription_id and not job['ended']:
+                return job  # still checking or downloading from the last check
+    job = create_job(subscription['url'], subscription['type'], subscription['folder'],
+                     title=subscription['title'], playlist=True, subscription=subscription_id,
+                     audio_name=subscription.get('audio_format'))
+    start_enumeration(job)
+    ensure_workers()
+    return job
+
+def check_due_subscriptions():
+    """Start checks of the subscriptions whose interval has passed, a few at a time.
+    
+    Returns how many due subscriptions are left waiting for a free slot.
+    """
+    now = time.time()
+    with queue_cond:
+        busy = {job['subscription'] for job in jobs.values()
+                if job['subscription'] is not None and not job['ended']}
+        enumerating = sum(1 for job in jobs.values()
+                          if job['subscription'] is not None and not job['enumerated'])
+    due = [subscription['id'] for subscription in list_subscriptions()
+           if subscription['id'] not in busy
+           and now >= (subscription['last_checked'] or 0) + subscription['interval_hours'] * 3600]
+    slots = max(0, SUBSCRIPTION_POLLS_AT_ONCE - enumerating)
+    for subscription_id in due[:slots]:
+        check_subscription(subscription_id)
+    return len(due[slots:])
+
+def subscription_loop():
+    engine_ready.wait()
+    while True:
+        waiting = check_due_subscriptions()
+        # Checks of most subscriptions take a second or two; keep going while there is a backlog
+        time.sleep(1 if waiting else SUBSCRIPTION_CHECK_INTERVAL)
+
+def start_subscriptions():
+    """Check subscriptions on a schedule in this process (the one holding the journal)."""
+    global subscription_scheduler
+    if subscription_scheduler is None:
+        subscription_scheduler = threading.Thread(target=subscription_loop, daemon=True)
+        subscription_scheduler.start()
+
+def extract_source_info(ydl, link, ie_key=None):
+    """Extract the info dict of a link without processing formats, caching single videos.
+    
+    The result can be handed to `ydl.process_ie_result(..., download=True)`
+    any number of times, by any YoutubeDL instance, without extracting again
+    (the same way yt-dlp's --load-info-json works).
+    """
+    info = ydl.extract_info(link, download=False, process=False, ie_key=ie_key)
+    if info.get('_type', 'video') != 'video':
+        # Playlists and redirects are resolved while processing; nothing to cache
+        return info
+    info = ydl.sanitize_info(info, remove_private_keys=True)
+    info_cache_put(link, info)
+    return info
+
+def iter_error_causes(error):
+    """Yield an exception and everything it wraps (yt-dlp nests the real cause)."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        exc_info = getattr(error, 'exc_info', None)
+        error = (getattr(error, 'cause', None)
+                 or (exc_info[1] if exc_info else None)
+                 or error.__cause__ or error.__context__)
+
+def classify_download_error(error):
+    """Sort a download failure into 'network', 'throttled', 'forbidden', 'format', 'auth', 'disk' or 'other'.
+    
+    'forbidden' (HTTP 403) is an expired stream URL or, when it repeats, a block.
+    """
+    message = str(error).lower()
+    for cause in iter_error_causes(error):
+        if isinstance(cause, NotEnoughDiskSpace) or (isinstance(cause, OSError) and cause.errno == errno.ENOSPC):
+            return 'disk'
+    if 'no space left on device' in message:
+        return 'disk'
+    if any(marker in message for marker in AUTH_ERROR_MARKERS):
+        return 'auth'
+    if any(marker in message for marker in THROTTLE_ERROR_MARKERS):
+        return 'throttled'
+    
+    status = None
+    for cause in iter_error_causes(error):
+        if isinstance(cause, yt_dlp.networking.exceptions.HTTPError):
+            status = cause.status
+            break
+        elif isinstance(cause, (yt_dlp.networking.exceptions.TransportError,
+                                yt_dlp.utils.ContentTooShortError,
+                                http.client.IncompleteRead,
+                                ConnectionError, socket.timeout, TimeoutError)):
+            return 'network'
+    
+    # Errors reported by the downloader only keep the text of the HTTP error
+    if status is None:
+        match = re.search(r'http error (\d{3})', message)
+        if match:
+            status = int(match.group(1))
+    if status is not None:
+        if status == 401:
+            return 'auth'
+        if status == 403:
+            return 'forbidden'
+        if status in (404, 410):
+            # The stream URL of this format is not usable
+            return 'format'
+        if status == 429:
+            return 'throttled'
+        if status >= 500:
+            return 'network'
+    
+    if 'requested format is not available' in message or 'no video formats found' in message:
+        return 'format'
+    if any(marker in message for marker in NETWORK_ERROR_MARKERS):
+        return 'network'
+    return 'other'
+
+def retry_delay(attempt):
+    """Seconds to wait before retry number `attempt`: exponential backoff with jitter."""
+    ceiling = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    return random.uniform(ceiling / 2, ceiling)
+
+class RetryLater(Exception):
+    """Raised by run_download to put a job back into the queue instead of failing it."""
+
+def pick_fallback_format(info, download_type, failed_formats):
+    """Choose the best other format from an extracted info dict, or None.
+    
+    Only formats that did not fail yet are considered. Video jobs prefer
+    formats with both video and audio up to 1080p (like the default format),
+    audio jobs prefer audio-only formats.
+    """
+    failed_ids = set()
+    for format_id in failed_formats:
+        failed_ids.update(format_id.split('+'))
+    
+    candidates = [f for f in info.get('formats') or []
+                  if f.get('format_id') and f['format_id'] not in failed_ids]
+    if download_type == 'audio':
+        preferred = [f for f in candidates if f.get('vcodec') == 'none' and f.get('acodec') != 'none']
+        sort_key = lambda f: (f.get('abr') or f.get('tbr') or 0)
+    else:
+        preferred = [f for f in candidates
+                     if f.get('vcodec') != 'none' and f.get('acodec') != 'none'
+                     and (f.get('height') or 0) <= 1080]
+        sort_key = lambda f: (f.get('height') or 0, f.get('tbr') or 0)
+    
+    for pool in (preferred, candidates):
+        if pool:
+            return max(pool, key=sort_key)['format_id']
+    return None
+
+# Metadata prefetch
+# Resolves a batch of pasted links before they are queued, so titles, sizes and
+# the disk space they need are known up front. Links are extracted in parallel
+# on a small pool, and single videos land in the info cache, so the jobs
+# queued afterwards start downloading without extracting again.
+
+def free_disk_space(folder):
+    """Free bytes on the filesystem of `folder`, or None if it cannot be checked."""
+    try:
+        return shutil.disk_usage(folder).free
+    except OSError:
+        return None
+
+def usable_disk_space(folder):
+    """Free bytes of `folder`'s filesystem that new downloads may take, or None if it cannot be checked.
+    
+    Leaves DISK_FREE_MARGIN and the space reserved by running downloads out,
+    like the admission check of a download does.
+    """
+    free = free_disk_space(folder)
+    try:
+        device = os.stat(folder).st_dev
+    except OSError:
+        return free
+    if free is None:
+        return None
+    with queue_cond:
+        held = sum(size for other_device, size in disk_reservations.values() if other_device == device)
+    return max(0, free - DISK_FREE_MARGIN - held)
+
+def disk_space_needed(estimate, download_type):
+    """Peak disk use of a download of `estimate` bytes (see DISK_SPACE_FACTORS)."""
+    return int(estimate * DISK_SPACE_FACTORS.get(download_type, 1))
+
+def summarize_info(ydl, info):
+    """Title, duration, resolutions and the estimated size of the format that would be downloaded."""
+    summary = {'title': info.get('title'), 'duration': None, 'resolutions': [], 'size': None,
+               'playlist': False, 'error': None}
+    if info.get('_type') in ('playlist', 'multi_video'):
+        summary['playlist'] = True
+        if isinstance(info.get('entries'), list):
+            summary['entries'] = len(info['entries'])
+        return summary
+    # Format selection only; nothing is downloaded
+    info = ydl.process_ie_result(copy.deepcopy(info), download=False)
+    summary['title'] = info.get('title') or summary['title']
+    summary['duration'] = info.get('duration')
+    summary['resolutions'] = sorted({f['height'] for f in info.get('formats') or [] if f.get('height')},
+                                    reverse=True)
+    summary['size'] = estimate_download_size(ydl, info)
+    return summary
+
+def estimate_download_size(ydl, info, probe=True):
+    """Estimated size of the format(s) selected in `info`, or None if one of them is unknown."""
+    selected = info.get('requested_formats') or [info]
+    sizes = [estimate_format_size(ydl, f, info.get('duration'), probe) for f in selected]
+    return sum(sizes) if all(sizes) else None
+
+def estimate_format_size(ydl, fmt, duration, probe=True):
+    """Size of a format as reported by the site, from its bitrate, or (with `probe`) from a HEAD request."""
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if not size and fmt.get('tbr') and duration:
+        size = int(fmt['tbr'] * 1000 / 8 * duration)
+    if probe and not size and fmt.get('protocol') in ('http', 'https') and fmt.get('url'):
+        # Direct file links: the server knows the size
+        try:
+            request = yt_dlp.networking.Request(fmt['url'], headers=fmt.get('http_headers'), method='HEAD')
+            with ydl.urlopen(request) as response:
+                size = int(response.headers.get('Content-Length') or 0)
+        except Exception:
+            pass
+    return size or None
+
+def prefetch_metadata(links, download_type, callback, cancel=None):
+    """Resolve the metadata of several links concurrently, in the background.
+    
+    callback(index, summary) is called from the pool threads as soon as a
+    link is resolved (see summarize_info; on failure only 'error' is set).
+    Setting the `cancel` event stops the remaining lookups.
+    """
+    pending = queue.Queue()
+    for index, link in enumerate(links):
+        pending.put((index, link))
+    
+    def prefetch_loop():
+        engine_ready.wait()
+        ydl_opts = base_ydl_opts()
+        ydl_opts.update({
+            'quiet': True,
+            'format': (AUDIO_FORMAT_SELECTORS.get(audio_format, 'bestaudio/best')
+                       if download_type == 'audio' else VIDEO_FORMAT_SELECTOR),
+        })
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            while not (cancel and cancel.is_set()):
+                try:
+                    index, link = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    info = info_cache_get(link) or extract_source_info(ydl, link)
+                    summary = summarize_info(ydl, info)
+                except Exception as e:
+                    summary = {'error': str(e).split('\n')[0]}
+                summary['url'] = link
+                callback(index, summary)
+    
+    for _ in range(min(PREFETCH_WORKERS, len(links))):
+        threading.Thread(target=prefetch_loop, daemon=True).start()
+
+# Output manager
+# Jobs download into OUTPUT_TEMP_DIR of their folder (yt-dlp's "temp" path), so
+# .part and fragment files are on the destination filesystem and yt-dlp moves
+# the finished files into the folder with a rename. Before a download starts the
+# job claims its final name, adding " (2)", " (3)", ... when another job or an
+# existing file has it, and reserves the disk space it is estimated to need.
+# Reservations are not reduced while downloads grow, so admission errs on the
+# safe side: a job that only fits once the running downloads are done waits for
+# them, and one that cannot fit at all fails before anything is written.
+# Names, reservations and temporary folder users are guarded by queue_cond.
+output_names = {}           # claimed final path without extension -> job id
+output_folders = {}         # download folder -> jobs with a claimed name in it
+disk_reservations = {}      # job id -> (device, bytes)
+
+class NotEnoughDiskSpace(Exception):
+    """Raised when a download does not fit on the disk of its folder."""
+
+def output_stem(ydl, info):
+    """Final path of a download without its extension (post-processing may change it)."""
+    filename = ydl.prepare_filename(info)
+    ext = info.get('ext')
+    if ext and filename.endswith('.' + ext):
+        filename = filename[:-len(ext) - 1]
+    return filename
+
+def output_extensions(job, info):
+    """Extensions of the files a download of `info` leaves in its folder."""
+    extensions = set()
+    if job['type'] in ('video', 'both'):
+        extensions.add(info.get('ext'))
+    if job['type'] in ('audio', 'both'):
+        if job['audio_format'] != 'original':
+            extensions.add(job['audio_format'])
+        elif info.get('ext') in yt_dlp.postprocessor.FFmpegExtractAudioPP.COMMON_AUDIO_EXTS:
+            extensions.add(info['ext'])
+        else:
+            # Depends on the codec ffprobe finds in the download
+            extensions.update(ORIGINAL_AUDIO_EXTENSIONS)
+    return extensions
+
+def output_exists(stem, extensions):
+    """Whether there already is a file with this path and one of `extensions`."""
+    return any(os.path.exists(f"{stem}.{ext}") for ext in extensions if ext)
+
+def claim_output_name(ydl, job, info):
+    """Pick a final name for the entry being downloaded that nothing else uses and set its suffix in `info`.
+    
+    Every entry of a job (links to several videos have more than one) gets
+    its own name. An entry keeps its suffix over retries and restarts, so it
+    continues its own .part file.
+    """
+    with queue_cond:
+        if job['output_name'] is None:
+            output_folders[job['folder']] = output_folders.get(job['folder'], 0) + 1
+        kept = job['output_suffixes'].get(info.get('id'))
+        if kept is None and not job['output_suffixes']:
+            kept = job['output_suffix']  # restored from the journal
+        for number in itertools.count(1):
+            suffix = kept if kept is not None else "" if number == 1 else f" ({number})"
+            info['output_suffix'] = suffix
+            stem = output_stem(ydl, info)
+            if kept is not None or (stem not in output_names
+                                    and not output_exists(stem, output_extensions(job, info))):
+                break
+        output_names[stem] = job['id']
+        job['output_name'] = stem
+        job['output_suffix'] = suffix
+        job['output_suffixes'][info.get('id')] = suffix
+
+def release_output_name(job):
+    """Free the names of an ended job, and the temporary folder once no job uses it."""
+    with queue_cond:
+        if job['output_name'] is None:
+            return
+        for stem in [stem for stem, job_id in output_names.items() if job_id == job['id']]:
+            del output_names[stem]
+        output_folders[job['folder']] -= 1
+        if output_folders[job['folder']]:
+            return
+        del output_folders[job['folder']]
+        try:
+            os.rmdir(os.path.join(job['folder'], OUTPUT_TEMP_DIR))
+        except OSError:
+            pass  # partial downloads of failed jobs are kept
+
+def reserve_disk_space(ydl, job, info):
+    """Reserve the disk space a download is estimated to need.
+    
+    Waits while the space is held by other running downloads and raises
+    NotEnoughDiskSpace if the download does not fit even without them.
+    Downloads of unknown size are not checked.
+    """
+    part_path = ydl.prepare_filename(info, 'temp') + '.part'
+    temp_dir = os.path.dirname(part_path)
+    try:
+        os.makedirs(temp_dir, exist_ok=True)
+        device = os.stat(temp_dir).st_dev
+    except OSError:
+        return  # yt-dlp reports the unusable folder
+    # A continued download already occupies the space of its .part file
+    try:
+        partial = os.path.getsize(part_path)
+    except OSError:
+        partial = 0
+    estimate = estimate_download_size(ydl, info, probe=False)
+    if estimate is None:
+        # Unknown size: admitted without a check, and without holding space for others
+        release_disk_space(job)
+        return
+    needed = max(0, disk_space_needed(estimate, job['type']) - partial)
+    if not needed:
+        release_disk_space(job)
+        return  # a continued download that already has its space
+    waited = False
+    while True:
+        free = free_disk_space(temp_dir)
+        if free is None:
+            return
+        usable = free - DISK_FREE_MARGIN
+        with queue_cond:
+            held = sum(size for job_id, (other_device, size) in disk_reservations.items()
+                       if job_id != job['id'] and other_device == device)
+            if needed <= usable - held:
+                disk_reservations[job['id']] = (device, needed)
+                break
+        if not held or needed > usable:
+            raise NotEnoughDiskSpace(f"Not enough disk space: {format_size(needed)} needed, "
+                                     f"{format_size(max(0, usable))} free")
+        set_job_state(job, job['state'], status_text=f"Waiting for disk space: {format_size(needed)} needed, "
+                                                     f"{format_size(max(0, usable - held))} not reserved")
+        if job['cancel'].wait(DISK_RECHECK_INTERVAL):
+            raise yt_dlp.utils.DownloadCancelled("Cancelled by user")
+        waited = True
+    if waited:
+        set_job_state(job, job['state'], status_text="")
+
+def release_disk_space(job):
+    """Give back the disk space reserved for a job."""
+    with queue_cond:
+        disk_reservations.pop(job['id'], None)
+
+# Segmented HTTP downloader
+# yt-dlp fetches progressive files over one connection, which many servers
+# throttle per stream. RangedHttpFD splits the file into pieces that parallel
+# Range requests write in place (os.pwrite) into a preallocated .part file. A
+# connection that runs out of work takes over the second half of the largest
+# piece still in flight, so slow pieces keep being re-split until the end. The
+# pieces left are saved next to the .part file, so a retry or a restart goes on
+# where it stopped. Servers that ignore ranges get yt-dlp's own downloader.
+RangedHttpFD = None  # defined by define_ranged_downloader() once yt_dlp is imported
+
+def ranged_download_suitable(info, params, filename):
+    """Whether a format should be fetched by RangedHttpFD (into `filename`)."""
+    if info.get('fragments') or info.get('is_live'):
+        return False
+    if yt_dlp.utils.determine_protocol(info) not in ('http', 'https'):
+        return False
+    # A preallocated .part file can only be continued from its saved ranges,
+    # even if this attempt was granted a single connection
+    if os.path.exists(filename + ".part.ranges"):
+        return True
+    if (params.get('concurrent_fragment_downloads') or 1) < 2:
+        return False
+    size = info.get('filesize') or info.get('filesize_approx')
+    return size is None or size >= RANGED_MIN_SIZE
+
+def piece_remaining(piece):
+    return piece['end'] - piece['pos'] + 1
+
+def split_piece(piece):
+    """Hand the second half of a piece to a new piece, or None if it is too small."""
+    remaining = piece_remaining(piece)
+    if remaining < 2 * RANGED_MIN_PIECE:
+        return None
+    middle = piece['pos'] + remaining // 2
+    new_piece = {'pos': middle, 'end': piece['end']}
+    piece['end'] = middle - 1
+    return new_piece
+
+def define_ranged_downloader():
+    """Define RangedHttpFD on top of the (lazily imported) yt-dlp downloaders."""
+    global RangedHttpFD
+    
+    class RangedHttpFD(yt_dlp.downloader.common.FileDownloader):
+        """Progressive HTTP download over parallel Range requests (see above)."""
+        
+        def real_download(self, filename, info_dict):
+            url = info_dict['url']
+            headers = dict(info_dict.get('http_headers') or {})
+            size = self.probe_size(url, headers)
+            if size is None or size < RANGED_MIN_SIZE:
+                return self.fallback(filename, info_dict)
+            
+            tmpfilename = self.temp_name(filename)
+            state_path = tmpfilename + ".ranges"
+            pieces = self.load_pieces(tmpfilename, state_path, size)
+            connections = max(1, int(self.params.get('concurrent_fragment_downloads') or 1))
+            while len(pieces) < connections:
+                new_piece = split_piece(max(pieces, key=piece_remaining)) if pieces else None
+                if new_piece is None:
+                    break
+                pieces.append(new_piece)
+            pieces.sort(key=lambda piece: piece['pos'])
+            
+            lock = threading.Lock()         # pieces, active and status
+            hook_lock = threading.Lock()    # progress hooks run one at a time
+            active = []
+            resumed = size - sum(piece_remaining(piece) for piece in pieces)
+            status = {'downloaded': resumed, 'error': None, 'saved': time.monotonic()}
+            started = time.time()
+            
+            def save_state():
+                left = [[piece['pos'], piece['end']] for piece in pieces + active if piece_remaining(piece) > 0]
+                try:
+                    with open(state_path + ".tmp", 'w', encoding='utf-8') as f:
+                        json.dump({'size': size, 'pieces': left}, f)
+                    os.replace(state_path + ".tmp", state_path)
+                except OSError:
+                    pass
+            
+            def next_piece(done):
+                with lock:
+                    if done is not None:
+                        active.remove(done)
+                        if piece_remaining(done) > 0:
+                            # Failed or cancelled: the rest stays in the saved state
+                            pieces.insert(0, done)
+                    if status['error'] is not None:
+                        return None
+                    if pieces:
+                        piece = pieces.pop(0)
+                    else:
+                        # Out of work: take over half of the largest piece in flight
+                        largest = max(active, key=piece_remaining, default=None)
+                        piece = split_piece(largest) if largest is not None else None
+                        if piece is None:
+                            return None
+                    active.append(piece)
+                    return piece
+            
+            def report():
+                now = time.time()
+                with hook_lock:
+                    with lock:
+                        downloaded = status['downloaded']
+                        if time.monotonic() - status['saved'] >= RANGED_STATE_INTERVAL:
+                            status['saved'] = time.monotonic()
+                            save_state()
+                    self._hook_progress({
+                        'status': 'downloading',
+                        'downloaded_bytes': downloaded,
+                        'total_bytes': size,
+                        'filename': filename,
+                        'tmpfilename': tmpfilename,
+                        'elapsed': now - started,
+                        'speed': self.calc_speed(started, now, downloaded - resumed),
+                        'eta': self.calc_eta(started, now, size - resumed, downloaded - resumed),
+                        # Lets the job show and tune its connections like fragments
+                        'fragment_count': connections,
+                    }, info_dict)
+            
+            def fetch(piece, fd):
+                with lock:
+                    start, end = piece['pos'], piece['end']
+                if start > end:
+                    return
+                request = yt_dlp.networking.Request(url, headers={**headers, 'Range': f'bytes={start}-{end}'})
+                response = self.ydl.urlopen(request)
+                try:
+                    if response.status != 206:
+                        raise yt_dlp.utils.DownloadError(f"Range request answered with HTTP {response.status}")
+                    while True:
+                        with lock:
+                            wanted = piece_remaining(piece)
+                        if wanted <= 0:
+                            return  # done, or the rest was handed to another connection
+                        block = response.read(min(BANDWIDTH_BLOCK_SIZE, wanted))
+                        if not block:
+                            raise yt_dlp.utils.ContentTooShortError(end - start + 1 - wanted, end - start + 1)
+                        # A split never moves the end of a piece closer than
+                        # RANGED_MIN_PIECE to its position, so this block stays ours
+                        with lock:
+                            block = block[:piece_remaining(piece)]
+                            position = piece['pos']
+                        os.pwrite(fd, block, position)
+                        with lock:
+                            piece['pos'] += len(block)
+                            status['downloaded'] += len(block)
+                        report()
+                finally:
+                    response.close()
+            
+            def worker(fd):
+                piece = next_piece(None)
+                retries = 0
+                while piece is not None:
+                    try:
+                        fetch(piece, fd)
+                    except Exception as e:
+                        if classify_download_error(e) == 'network' and retries < NETWORK_RETRIES:
+                            # The next free connection continues the piece where this one dropped
+                            retries += 1
+                            with lock:
+                                active.remove(piece)
+                                pieces.insert(0, piece)
+                            time.sleep(retry_delay(retries))
+                            piece = next_piece(None)
+                            continue
+                        with lock:
+                            if status['error'] is None:
+                                status['error'] = e
+                    else:
+                        retries = 0
+                    piece = next_piece(piece)
+            
+            self.report_destination(filename)
+            fd = os.open(tmpfilename, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                # The state goes first, so a full-size .part file is never taken for a finished one
+                save_state()
+                try:
+                    os.posix_fallocate(fd, 0, size)
+                except (AttributeError, OSError):
+                    os.ftruncate(fd, size)
+                threads = [threading.Thread(target=worker, args=(fd,), daemon=True)
+                           for _ in range(min(connections, len(pieces)))]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            finally:
+                os.close(fd)
+            
+            if status['error'] is not None:
+                save_state()
+                raise status['error']
+            self.try_rename(tmpfilename, filename)
+            self.try_remove(state_path)
+            self._hook_progress({
+                'status': 'finished',
+                'downloaded_bytes': size,
+                'total_bytes': size,
+                'filename': filename,
+                'elapsed': time.time() - started,
+                'fragment_count': connections,
+            }, info_dict)
+            return True
+        
+        def probe_size(self, url, headers):
+            """Size of the file if the server answers Range requests, else None."""
+            try:
+                response = self.ydl.urlopen(yt_dlp.networking.Request(url, headers={**headers, 'Range': 'bytes=0-0'}))
+            except yt_dlp.networking.exceptions.HTTPError as e:
+                if e.status == 429 or e.status >= 500:
+                    raise  # retried like any other download
+                return None  # e.g. no ranges for this method; yt-dlp's downloader reports real errors
+            try:
+                match = re.fullmatch(r'bytes 0-0/(\d+)', response.headers.get('Content-Range') or '')
+                return int(match.group(1)) if response.status == 206 and match else None
+            finally:
+                response.close()
+        
+        def load_pieces(self, tmpfilename, state_path, size):
+            """Byte ranges still to fetch: the saved ones, the rest of a single-connection .part file, or all."""
+            if os.path.exists(tmpfilename):
+                if os.path.exists(state_path):
+                    try:
+                        with open(state_path, encoding='utf-8') as f:
+                            state = json.load(f)
+                        if state['size'] == size:
+                            return [{'pos': start, 'end': end} for start, end in state['pieces']]
+                    except (OSError, ValueError, KeyError, TypeError):
+                        pass
+                    os.truncate(tmpfilename, 0)
+                else:
+                    # yt-dlp's own downloader wrote the start of the file
+                    done = min(os.path.getsize(tmpfilename), size)
+                    return [{'pos': done, 'end': size - 1}] if done < size else []
+            return [{'pos': 0, 'end': size - 1}]
+        
+        def fallback(self, filename, info_dict):
+            """Download with yt-dlp's single-connection HTTP downloader."""
+            tmpfilename = self.temp_name(filename)
+            if os.path.exists(tmpfilename + ".ranges"):
+                # HttpFD would continue after the end of the preallocated .part
+                # file and take it for finished; start over instead
+                try:
+                    os.truncate(tmpfilename, 0)
+                except OSError:
+                    pass
+                self.try_remove(tmpfilename + ".ranges")
+            fd = yt_dlp.downloader.http.HttpFD(self.ydl, self.params)
+            for hook in self._progress_hooks:
+                if hook != self.report_progress:
+                    fd.add_progress_hook(hook)
+            return fd.real_download(filename, info_dict)
+
+# Post-processing pool
+# Download workers hand every downloaded file to `postprocess_queue` instead of
+# running ffmpeg themselves, so the network stays busy while files are merged
+# or converted. Files that need no ffmpeg work are finished right away.
+postprocess_queue = queue.Queue()
+postprocess_workers = []
+
+PipelineYoutubeDL = None  # defined by define_pipeline_ydl() once yt_dlp is imported
+
+def define_pipeline_ydl():
+    """Define PipelineYoutubeDL on top of the (lazily imported) yt_dlp.YoutubeDL."""
+    global PipelineYoutubeDL
+    
+    class PipelineYoutubeDL(yt_dlp.YoutubeDL):
+        """YoutubeDL that queues post-processing on the ffmpeg pool instead of running it inline."""
+        
+        def __init__(self, params, job):
+            super().__init__(params)
+            self.job = job
+            self.release_pending = False
+        
+        def post_process(self, filename, info, files_to_move=None):
+            if not info.get('__postprocessors') and not self.params.get('postprocessors'):
+                info = super().post_process(filename, info, files_to_move)
+                record_job_output(self.job, info.get('filepath'))
+                archive_record_info(info, self.job['type'])
+                return info
+            with queue_cond:
+                self.job['pp_pending'] += 1
+            ensure_postprocess_workers()
+            # A copy: once this returns, yt-dlp strips the fields shared with the
+            # video from the format's info dict (id, title, extractor, ...)
+            postprocess_queue.put((self, filename, dict(info), files_to_move))
+            return info
+        
+        def process_info(self, info_dict):
+            # Known before the first request, in case that already fails
+            record_selected_format(self.job, info_dict)
+            # The final name and the disk space are settled before anything is written
+            claim_output_name(self, self.job, info_dict)
+            reserve_disk_space(self, self.job, info_dict)
+            return super().process_info(info_dict)
+        
+        def run_post_process(self, filename, info, files_to_move):
+            """Run the post-processors that post_process deferred (on a pool thread)."""
+            return super().post_process(filename, info, files_to_move)
+        
+        def dl(self, name, info, subtitle=False, test=False):
+            if subtitle or test or not ranged_download_suitable(info, self.params, name):
+                return super().dl(name, info, subtitle, test)
+            # Same as YoutubeDL.dl, with the segmented downloader
+            fd = RangedHttpFD(self, self.params)
+            for hook in self._progress_hooks:
+                fd.add_progress_hook(hook)
+            new_info = self._copy_infodict(info)
+            if new_info.get('http_headers') is None:
+                new_info['http_headers'] = self._calc_headers(new_info)
+            return fd.download(name, new_info, subtitle)
+
+def ensure_postprocess_workers():
+    """Start the post-processing threads on first use."""
+    with queue_cond:
+        while len(postprocess_workers) < POSTPROCESS_WORKERS:
+            thread = threading.Thread(target=postprocess_loop, daemon=True)
+            postprocess_workers.append(thread)
+            thread.start()
+
+def postprocess_loop():
+    """Post-processing thread: merge/convert downloaded files one after another."""
+    while True:
+        ydl, filename, info, files_to_move = postprocess_queue.get()
+        job = ydl.job
+        try:
+            if job['cancel'].is_set():
+                raise yt_dlp.utils.DownloadCancelled("Cancelled by user")
+            set_job_state(job, 'post-processing', status_text="")
+            info = ydl.run_post_process(filename, info, files_to_move)
+            record_job_output(job, info.get('filepath'))
+            archive_record_info(info, job['type'])
+        except yt_dlp.utils.DownloadCancelled:
+            end_job(job, 'cancelled')
+        except Exception as e:
+            end_job(job, 'failed', str(e).split('\n')[0])
+        with queue_cond:
+            job['pp_pending'] -= 1
+            release = ydl.release_pending and not job['pp_pending']
+        finish_job(job)
+        if release:
+            release_ydl(ydl)
+
+# Warm YoutubeDL pool
+# Building a YoutubeDL loads the cookie file, sets up its post-processors and
+# starts with a cold HTTP connection pool. Idle instances are kept per option
+# profile (download type and audio format) and reused by later jobs and retry
+# attempts. An instance serves one job at a time: its hooks are routed to
+# `ydl.job`, and it only returns to the pool once the ffmpeg pool is done with
+# that job's files. Cookies a site sets are merged into cookies.txt when an
+# instance is released. Replacing cookies.txt (any change the pool did not write)
+# starts a new cookie epoch: idle instances are retired, and instances of an
+# older epoch are discarded on release without writing their cookies.
+YDL_POOL_IDLE_MAX = MAX_WORKERS_LIMIT   # idle instances kept per profile
+ydl_pool_lock = threading.Lock()        # also serializes writes of cookies.txt
+ydl_pool = {}
+ydl_pool_cookies = None                 # mtime of cookies.txt as last seen or written by the pool
+ydl_pool_epoch = 0
+
+def cookies_stamp():
+    """Modification time of the cookie file, or None if there is none."""
+    try:
+        return os.path.getmtime(get_cookies_path())
+    except OSError:
+        return None
+
+def pooled_ydl_opts(download_type, audio_name):
+    """Options shared by every job of a pool profile; acquire_ydl sets the per-job ones."""
+    ydl_opts = base_ydl_opts()
+    ydl_opts.update({
+        # Small fixed reads, so the bandwidth scheduler can pace them evenly
+        'buffersize': BANDWIDTH_BLOCK_SIZE,
+        'noresizebuffer': True,
+    })
+    
+    # Post-processing for audio (extract audio, convert only if needed).
+    # FFmpegExtractAudio probes the source codec with ffprobe and stream-copies
+    # it when it already matches the target ('best' keeps any common codec).
+    if download_type in ('audio', 'both'):
+        ydl_opts['postprocessors'] = [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'best' if audio_name == 'original' else audio_name,
+            'preferredquality': '192', # High quality for lossy re-encodes
+        }]
+    if download_type in ('video', 'both'):
+        # Add merge output format for video download
+        ydl_opts['merge_output_format'] = 'mp4'
+    if download_type == 'both':
+        # The audio file is extracted from the finished video, which is kept
+        ydl_opts['keepvideo'] = True
+    return ydl_opts
+
+def check_cookies_file():
+    """Start a new cookie epoch if cookies.txt was changed by someone else (ydl_pool_lock held).
+    
+    Returns the idle instances that have to be discarded.
+    """
+    global ydl_pool_cookies, ydl_pool_epoch
+    stamp = cookies_stamp()
+    if stamp == ydl_pool_cookies:
+        return []
+    retired = [ydl for idle in ydl_pool.values() for ydl in idle]
+    ydl_pool.clear()
+    ydl_pool_cookies = stamp
+    ydl_pool_epoch += 1
+    return retired
+
+def cookie_snapshot(jar):
+    """The cookies of a jar, to find out later which ones a site changed."""
+    return {(cookie.domain, cookie.path, cookie.name): (cookie.value, cookie.expires) for cookie in jar}
+
+def save_pool_cookies(ydl):
+    """Merge the cookies a site changed in an instance's jar into cookies.txt (ydl_pool_lock held).
+    
+    Other instances may have written the file since this one loaded it, so
+    only this instance's own changes are applied on top of the file.
+    """
+    global ydl_pool_cookies
+    path = ydl.params.get('cookiefile')
+    current = cookie_snapshot(ydl.cookiejar)
+    if not path or current == ydl.cookie_snapshot:
+        return
+    jar = yt_dlp.cookies.YoutubeDLCookieJar(path)
+    if os.path.exists(path):
+        jar.load()
+    for cookie in ydl.cookiejar:
+        key = (cookie.domain, cookie.path, cookie.name)
+        if ydl.cookie_snapshot.get(key) != current[key]:
+            jar.set_cookie(cookie)
+    for domain, cookie_path, name in ydl.cookie_snapshot.keys() - current.keys():
+        try:
+            jar.clear(domain, cookie_path, name)
+        except KeyError:
+            pass
+    jar.save()
+    ydl_pool_cookies = cookies_stamp()
+    # The instance continues with the merged cookies
+    ydl.cookiejar.clear()
+    for cookie in jar:
+        ydl.cookiejar.set_cookie(cookie)
+    ydl.cookie_snapshot = cookie_snapshot(ydl.cookiejar)
+
+def acquire_ydl(job, output_template):
+    """Take a warm PipelineYoutubeDL for a job from the pool, or build one."""
+    key = (job['type'], job['audio_format'] if job['type'] in ('audio', 'both') else None)
+    with ydl_pool_lock:
+        retired = check_cookies_file()
+        epoch = ydl_pool_epoch
+        idle = ydl_pool.get(key)
+        ydl = idle.pop() if idle else None
+    for old in retired:
+        discard_ydl(old)
+    
+    if ydl is None:
+        ydl = PipelineYoutubeDL(pooled_ydl_opts(*key), job)
+        ydl.pool_key = key
+        ydl.cookie_epoch = epoch
+        ydl.cookie_snapshot = cookie_snapshot(ydl.cookiejar)
+        ydl.add_progress_hook(lambda d: progress_hook(ydl.job, d))
+        ydl.add_postprocessor_hook(lambda d: postprocessor_hook(ydl.job, d))
+    ydl.job = job
+    ydl.params['outtmpl']['default'] = output_template
+    ydl.params['paths'] = {'home': job['folder'], 'temp': OUTPUT_TEMP_DIR}
+    # Playlist entries are single videos, even if their URL mentions a list
+    ydl.params['noplaylist'] = job['parent'] is not None
+    return ydl
+
+def set_ydl_format(ydl, format_spec):
+    """Select the format of the next download of a pooled instance."""
+    if ydl.params.get('format') != format_spec:
+        ydl.params['format'] = format_spec
+        ydl.format_selector = ydl.build_format_selector(format_spec)
+
+def release_ydl(ydl):
+    """Put an instance back into the pool, or mark it to go back once its job's
+    files are post-processed."""
+    with queue_cond:
+        if ydl.job['pp_pending']:
+            ydl.release_pending = True
+            return
+        ydl.release_pending = False
+    ydl.job = None
+    with ydl_pool_lock:
+        retired = check_cookies_file()
+        if ydl.cookie_epoch == ydl_pool_epoch:
+            try:
+                save_pool_cookies(ydl)
+            except (OSError, ValueError) as e:
+                # The cookies of this instance are lost, the job is not
+                report_message('cookies_not_saved', error=e)
+                retired.append(ydl)
+            else:
+                idle = ydl_pool.setdefault(ydl.pool_key, [])
+                if len(idle) < YDL_POOL_IDLE_MAX:
+                    idle.append(ydl)
+                else:
+                    retired.append(ydl)
+        else:
+            retired.append(ydl)
+    for old in retired:
+        discard_ydl(old)
+
+def discard_ydl(ydl):
+    """Close an instance without writing its (possibly outdated) cookies back."""
+    ydl.params['cookiefile'] = None
+    ydl.close()
+
+def finish_job(job):
+    """Mark a job done once it is downloaded and none of its files wait for post-processing."""
+    with queue_cond:
+        if not job['downloaded'] or job['pp_pending']:
+            return False
+    end_job(job, 'done')
+    return True
+
+def run_download(job):
+    """Runs download process for one queued job using yt-dlp library, supporting video and audio.
+    
+    MP3 uzantısının iki kez eklenmesi sorununu çözmek için:
+    Audio (ses) indirmelerde, çıktı şablonunda uzantıyı (% (ext) s) kullanmayız, 
+    böylece post-processor (FFmpegExtractAudio) tek bir .mp3 uzantısı ekler.
+    """
+    link = job['url']
+    download_type = job['type']
+    from_cache = False
+    ydl = None
+    requeue_text = None
+    try:
+        # Already downloaded before? Checked against the archive before any network access
+        archive_key = archive_key_for_info(job['info']) if job['info'] else archive_key_for_url(link)
+        if archive_contains(archive_key, download_type):
+            end_job(job, 'skipped')
+            return
+        
+        # Determine output template and format based on download type
+        if download_type in ('video', 'both'):
+            # Video: Uzantı şablonda tutulur. 'both' names the audio file after the video.
+            output_template = OUTPUT_NAME_TEMPLATE + ".%(ext)s"
+            ydl_format = VIDEO_FORMAT_SELECTOR
+        elif download_type == 'audio':
+            if job['audio_format'] == 'mp3':
+                # Audio: Uzantı şablondan kaldırılır. Post-processor MP3'e dönüştürürken 
+                # uzantıyı kendisi ekleyecektir.
+                output_template = OUTPUT_NAME_TEMPLATE
+            else:
+                # Files that are already in the target format are kept as they are,
+                # so they need their own extension
+                output_template = OUTPUT_NAME_TEMPLATE + ".%(ext)s"
+            ydl_format = AUDIO_FORMAT_SELECTORS.get(job['audio_format'], 'bestaudio/best')
+        else: # Default to video for safety
+            output_template = OUTPUT_NAME_TEMPLATE + ".%(ext)s"
+            ydl_format = VIDEO_FORMAT_SELECTOR
+        
+        # A job resumed from the journal continues the format of its .part file
+        if job['format_id']:
+            ydl_format = job['format_id']
+        
+        # A warm instance for this kind of download, used for every attempt below
+        ydl = acquire_ydl(job, output_template) # Yukarıda belirlenen şablon kullanılır
+        
+        # Reuse an already extracted info dict when there is one; every attempt
+        # below processes a copy of it, so a fallback does not extract again
+        source_info = job['info'] or info_cache_get(link)
+        from_cache = source_info is not None and job['info'] is None
+        
+        failed_formats = []
+        network_retries = 0
+        bandwidth_register(job)
+        while True:
+            try:
+                job['bw_counted'] = None
+                job['site'] = get_site_key(source_info, link)
+                ydl.params['concurrent_fragment_downloads'] = acquire_fragments(job)
+                set_ydl_format(ydl, ydl_format)
+                job['ydl_params'] = ydl.params
+                if source_info is None:
+                    source_info = extract_source_info(ydl, link, job['ie_key'])
+                    job['site'] = get_site_key(source_info, link)
+                ydl.process_ie_result(copy.deepcopy(source_info), download=True)
+                break
+                
+            except yt_dlp.utils.DownloadCancelled:
+                raise
+            except Exception as e:
+                if job['cancel'].is_set():
+                    raise yt_dlp.utils.DownloadCancelled("Cancelled by user")
+                error_kind = classify_download_error(e)
+                if error_kind == 'forbidden':
+                    # Repeated 403s are a block and wait like rate limiting;
+                    # a single one gets fresh stream URLs or another format
+                    error_kind = 'throttled' if circuit_forbidden(job) else 'format'
+                
+                if error_kind == 'network' and network_retries < NETWORK_RETRIES:
+                    # Same format again, so yt-dlp continues the existing .part file
+                    network_retries += 1
+                    job['retries'] += 1
+                    if job['format_id']:
+                        ydl_format = job['format_id']
+                    set_job_state(job, job['state'],
+                                  status_text=f"Connection lost, resuming ({network_retries}/{NETWORK_RETRIES})...")
+                    if job['cancel'].wait(retry_delay(network_retries)):
+                        raise yt_dlp.utils.DownloadCancelled("Cancelled by user")
+                    continue
+                
+                if error_kind == 'throttled' and job['throttled'] < THROTTLE_RETRIES:
+                    job['throttled'] += 1
+                    job['retries'] += 1
+                    if job['format_id']:
+                        ydl_format = job['format_id']
+                    cooldown = circuit_failure(job)
+                    if cooldown:
+                        # The site is paused: wait in the queue and free the slot for other sites
+                        raise RetryLater(f"Paused: {circuit_key(job)} is rate limiting, "
+                                         f"retrying in {cooldown:.0f}s")
+                    delay = retry_delay(job['throttled'])
+                    set_job_state(job, job['state'],
+                                  status_text=f"Rate limited, retrying in {delay:.0f}s "
+                                              f"({job['throttled']}/{THROTTLE_RETRIES})...")
+                    if job['cancel'].wait(delay):
+                        raise yt_dlp.utils.DownloadCancelled("Cancelled by user")
+                    continue
+                
+                if error_kind == 'format' and from_cache:
+                    # Stream URLs of a cached info dict may have expired; extract again first
+                    info_cache_delete(link)
+                    source_info = None
+                    from_cache = False
+                    job['retries'] += 1
+                    continue
+                
+                if error_kind == 'format' and source_info is not None:
+                    # Pick another format from the list we already extracted; without a
+                    # selected format the selector itself matched nothing
+                    if job['format_id']:
+                        failed_formats.append(job['format_id'])
+                    fallback_format = pick_fallback_format(source_info, download_type, failed_formats)
+                    if fallback_format is not None and job['fallbacks'] < MAX_FORMAT_FALLBACKS:
+                        job['fallbacks'] += 1
+                        ydl_format = fallback_format
+                        job['format_id'] = None
+                        set_job_state(job, 'extracting', 0,
+                                      f"Trying alternative format {fallback_format}...")
+                        continue
+                
+                if error_kind == 'auth' and any(marker in str(e).lower() for marker in BOT_CHECK_MARKERS):
+                    # This job needs cookies, but the other jobs of the site
+                    # should not run into the bot check one after another
+                    circuit_failure(job, trip=True)
+                job['error_kind'] = error_kind
+                raise
+        
+        circuit_success(job)
+        # Post-processing may still be running on the ffmpeg pool; the job is
+        # done once the last of its files has been processed
+        job['downloaded'] = True
+        if not finish_job(job):
+            set_job_state(job, 'post-processing', 100, "Waiting for ffmpeg...")
+        
+    except yt_dlp.utils.DownloadCancelled:
+        end_job(job, 'cancelled')
+    except RetryLater as e:
+        requeue_text = str(e)
+    except Exception as e:
+        # Cached stream URLs may have expired; extract again next time
+        if from_cache:
+            info_cache_delete(link)
+        # Attempt to clean up the error message for better readability
+        end_job(job, 'failed', str(e).split('\n')[0])
+    
+    job['ydl_params'] = None
+    if ydl is not None:
+        release_ydl(ydl)
+    release_fragments(job)
+    bandwidth_unregister(job)
+    # Only now, so no other worker picks the job up while it still holds its resources
+    if requeue_text is not None:
+        requeue_job(job, requeue_text)
+
+def set_audio_format(name):
+    """Set the audio output format used by new audio jobs."""
+    global audio_format
+    audio_format = name if name in AUDIO_FORMATS else DEFAULT_AUDIO_FORMAT
+
+def apply_config(config):
+    """Apply the engine settings of a loaded configuration (see load_config)."""
+    global info_cache_ttl, info_cache_max_bytes
+    set_max_workers(config.get('max_workers', DEFAULT_MAX_WORKERS))
+    set_fragment_cap(config.get('fragment_cap', DEFAULT_FRAGMENT_CAP))
+    info_cache_ttl = config.get('info_cache_ttl', DEFAULT_INFO_CACHE_TTL)
+    info_cache_max_bytes = config.get('info_cache_max_mb', DEFAULT_INFO_CACHE_MAX_MB) * 1024 * 1024
+    set_bandwidth_limit(config.get('bandwidth_limit_kb', DEFAULT_BANDWIDTH_LIMIT))
+    set_bandwidth_schedule(config.get('bandwidth_schedule'))
+    set_audio_format(config.get('audio_format', DEFAULT_AUDIO_FORMAT))
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# YT-DLP-GUI command line and daemon
+# Downloads with the same engine as the GUI, without a display:
+#   yt-dlp-cli.py URL... [-o FOLDER]        download and wait until everything is done
+#   yt-dlp-cli.py -a links.txt              links from a file ('-' = stdin)
+#   yt-dlp-cli.py --daemon                  keep running and accept jobs over the local API
+#   yt-dlp-cli.py --submit URL...           hand links to a running daemon
+#   yt-dlp-cli.py --subscribe URL...        check channels/playlists for new entries (GUI or daemon)
+import argparse
+import sys
+import os
+import json
+import time
+import http.client
+import engine
+
+def read_links(args):
+    """Collect links from the arguments, a batch file and/or stdin."""
+    links = list(args.urls)
+    if args.batch_file:
+        if args.batch_file == '-':
+            links.extend(sys.stdin.read().split())
+        else:
+            with open(args.batch_file, encoding='utf-8') as f:
+                links.extend(line.strip() for line in f
+                             if line.strip() and not line.startswith('#'))
+    elif not links and not sys.stdin.isatty():
+        links.extend(sys.stdin.read().split())
+    return links
+
+# Last state printed per job id
+printed_states = {}
+
+def print_job_change(job):
+    """Job listener: print a line whenever a job changes its state."""
+    if printed_states.get(job['id']) == job['state']:
+        return
+    printed_states[job['id']] = job['state']
+    line = f"[{job['id']}] {job['state']}: {job['title']}"
+    if job['state'] == 'failed' and job['error']:
+        line += f" - {job['error']}"
+        if job['error_kind'] == 'auth':
+            line += f" ({engine.AUTH_HINT})"
+        elif job['error_kind'] == 'disk':
+            line += f" ({engine.DISK_HINT})"
+    elif job['state'] == 'queued' and job['status_text']:
+        line += f" - {job['status_text']}"
+    print(line, flush=True)
+
+def print_message(key, fields):
+    """Message listener: print an engine notice to stderr."""
+    print(engine.MESSAGES[key].format(**fields), file=sys.stderr, flush=True)
+
+def download_type(args):
+    """Download type chosen on the command line."""
+    if args.both:
+        return 'both'
+    return 'audio' if args.audio else 'video'
+
+def start_engine(args):
+    """Load yt_dlp and the saved settings, then apply the command line overrides."""
+    engine.quiet = not args.verbose
+    engine.message_listeners.append(print_message)
+    engine.warm_up()
+    if engine.missing_dependencies:
+        print("Missing dependencies: " + ", ".join(engine.missing_dependencies), file=sys.stderr)
+        sys.exit(1)
+    config = engine.load_config()
+    engine.apply_config(config)
+    if args.workers:
+        engine.set_max_workers(args.workers)
+    if args.limit is not None:
+        engine.set_bandwidth_limit(args.limit)
+    if args.audio_format:
+        engine.set_audio_format(args.audio_format)
+    return config
+
+def run_local(args, links):
+    """Download the links in this process and wait until all jobs have ended."""
+    start_engine(args)
+    engine.job_listeners.append(print_job_change)
+    submitted = [engine.submit_job(link, download_type(args), args.output, args.playlist) for link in links]
+    try:
+        while not all(job['ended'] for job in submitted):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        for job in submitted:
+            engine.cancel_job(job['id'])
+        return 130
+    with engine.queue_cond:
+        failed = [job for job in engine.jobs.values() if job['state'] == 'failed']
+    return 1 if failed else 0
+
+def run_daemon(args):
+    """Serve the job API on localhost until interrupted."""
+    config = start_engine(args)
+    port = args.port or config.get('daemon_port', engine.DEFAULT_DAEMON_PORT)
+    if engine.start_api_server(port, jobs_api=True, default_folder=args.output) is None:
+        return 1
+    engine.job_listeners.append(print_job_change)
+    resumed_jobs = engine.open_journal()
+    if resumed_jobs is None:
+        print("Job journal is used by another process; jobs of this daemon are not journaled", file=sys.stderr)
+    elif resumed_jobs:
+        print(f"Resumed {len(resumed_jobs)} unfinished jobs from the job journal", flush=True)
+    if resumed_jobs is not None:
+        engine.start_subscriptions()
+    print(f"Download daemon listening on http://127.0.0.1:{port} (folder: {args.output})", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        return 0
+
+def manage_subscriptions(args, links):
+    """Add, remove or list subscriptions; the GUI or daemon checks them."""
+    if args.subscribe:
+        if args.audio_format:
+            engine.set_audio_format(args.audio_format)
+        else:
+            engine.set_audio_format(engine.load_config().get('audio_format', engine.DEFAULT_AUDIO_FORMAT))
+        for link in links:
+            subscription = engine.add_subscription(link, download_type(args), args.output, args.interval,
+                                                   only_new=not args.backfill)
+            print(f"Subscribed [{subscription['id']}] {link}")
+    for subscription_id in args.unsubscribe or []:
+        engine.remove_subscription(subscription_id)
+    if args.subscriptions:
+        for subscription in engine.list_subscriptions():
+            checked = (time.strftime('%Y-%m-%d %H:%M', time.localtime(subscription['last_checked']))
+                       if subscription['last_checked'] else "never")
+            print(f"[{subscription['id']}] {subscription['title'] or subscription['url']} "
+                  f"({subscription['type']}, every {subscription['interval_hours']}h, checked: {checked}, "
+                  f"new: {subscription['last_new']})")
+    return 0
+
+def submit_to_daemon(args, links):
+    """Hand the links to a running daemon."""
+    config = engine.load_config()
+    port = args.port or config.get('daemon_port', engine.DEFAULT_DAEMON_PORT)
+    request = {
+        'urls': links,
+        'type': download_type(args),
+        # This command line's format, not the daemon's
+        'audio_format': args.audio_format or config.get('audio_format', engine.DEFAULT_AUDIO_FORMAT),
+        'folder': args.output,
+        'playlist': args.playlist,
+    }
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        connection.request('POST', '/jobs', json.dumps(request),
+                           {'Content-Type': 'application/json', engine.API_TOKEN_HEADER: engine.get_api_token() or ''})
+        response = connection.getresponse()
+        answer = response.read()
+    except OSError as e:
+        print(f"Download daemon on port {port} not reachable: {e}", file=sys.stderr)
+        return 1
+    finally:
+        connection.close()
+    if response.status != 200:
+        print(f"Download daemon refused the jobs: {response.status} {response.reason}", file=sys.stderr)
+        return 1
+    print("Queued jobs: " + ", ".join(str(job_id) for job_id in json.loads(answer)['ids']))
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Download videos with the YT-DLP-GUI engine, without a window.")
+    parser.add_argument('urls', nargs='*', help="links to download")
+    parser.add_argument('-a', '--batch-file', help="file with one link per line ('-' for stdin)")
+    parser.add_argument('-o', '--output', default=os.getcwd(), help="download folder (default: current folder)")
+    parser.add_argument('-x', '--audio', action='store_true', help="download audio instead of video")
+    parser.add_argument('--both', action='store_true', help="download the video and make the audio file from it")
+    parser.add_argument('--audio-format', choices=engine.AUDIO_FORMATS, help="audio output format")
+    parser.add_argument('--playlist', action='store_true', help="download every video of playlist/channel links")
+    parser.add_argument('-j', '--workers', type=int, help="parallel downloads")
+    parser.add_argument('--limit', type=int, help="bandwidth limit in KB/s (0 = unlimited)")
+    parser.add_argument('--daemon', action='store_true', help="keep running and accept jobs over the local API")
+    parser.add_argument('--submit', action='store_true', help="send the links to a running daemon")
+    parser.add_argument('-v', '--verbose', action='store_true', help="show yt-dlp's own output")
+    parser.add_argument('--port', type=int, help="daemon port (default: daemon_port from config.json)")
+    parser.add_argument('--subscribe', action='store_true', help="subscribe to the channel/playlist links instead of downloading them")
+    parser.add_argument('--interval', type=int, default=engine.DEFAULT_SUBSCRIPTION_HOURS,
+                        help=f"hours between subscription checks (default {engine.DEFAULT_SUBSCRIPTION_HOURS})")
+    parser.add_argument('--backfill', action='store_true', help="first subscription check downloads the existing entries too")
+    parser.add_argument('--unsubscribe', nargs='+', metavar='ID', help="remove subscriptions")
+    parser.add_argument('--subscriptions', action='store_true', help="list subscriptions")
+    args = parser.parse_args()
+    args.output = os.path.abspath(args.output)
+
+    if args.daemon:
+        return run_daemon(args)
+
+    if args.unsubscribe or args.subscriptions:
+        return manage_subscriptions(args, [])
+    links = read_links(args)
+    if not links:
+        parser.error("no links given")
+    if args.subscribe:
+        return manage_subscriptions(args, links)
+    if args.submit:
+        return submit_to_daemon(args, links)
+    return run_local(args, links)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,14 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import threading
-import os
+import queue
 import json
-import re
-from datetime import datetime, timedelta
-import shutil
-import yt_dlp
+import time
+import http.client
+import sqlite3
+import engine
+
+STARTUP_STARTED = time.perf_counter()
 
 # Translation Dictionary
 translations = {
@@ -23,6 +25,13 @@ translations = {
         'error_no_link': "Please enter a YouTube link.",
         'error_no_folder': "Please select download folder.",
         'error_download': "An error occurred during download: ",
+        'error_auth': "Sign-in or bot check required. Add cookies to ~/.config/yt-dlp-gui/cookies.txt and try again.",
+        'error_disk': "Free up space in the download folder and try again; partial downloads are kept in .yt-dlp-gui-temp.",
+        'error_daemon': "Download daemon not reachable: ",
+        'message_daemon': "Connected to the download daemon on port {port}.",
+        'site_throttled': "{site} is rate limiting; its jobs are paused for {cooldown}s.",
+        'api_disabled': "Local API on port {port} disabled: {error}",
+        'cookies_not_saved': "Could not save cookies: {error}",
         'theme_menu': "Theme",
         'light_theme': "Light Theme",
         'dark_theme': "Dark Theme",
@@ -30,9 +39,72 @@ translations = {
         'download_speed': "Speed:",
         'download_eta': "ETA:",
         'download_size': "Size:",
+        'download_fragments': "Fragments:",
         'download_type_label': "Download Type:",
         'type_video': "Video",
-        'type_audio': "Audio (MP3)",
+        'type_audio': "Audio",
+        'type_both': "Video + Audio",
+        'playlist_mode': "Playlist / Channel",
+        'playlist_entries': "{count} entries found",
+        'queue_label': "Download Queue:",
+        'workers_label': "Parallel downloads:",
+        'fragments_label': "Max. fragments:",
+        'audio_format_label': "Audio:",
+        'audio_original': "Original (copy)",
+        'col_title': "Title",
+        'col_type': "Type",
+        'col_state': "Status",
+        'col_progress': "Progress",
+        'cancel_button': "Cancel",
+        'move_up_button': "Move Up",
+        'move_down_button': "Move Down",
+        'priority_button': "Download First",
+        'limit_label': "Limit (KB/s):",
+        'state_queued': "Queued",
+        'state_extracting': "Extracting",
+        'state_downloading': "Downloading",
+        'state_post_processing': "Post-processing",
+        'state_done': "Done",
+        'state_failed': "Failed",
+        'state_cancelled': "Cancelled",
+        'state_skipped': "Already downloaded",
+        'playlist_skipped': "{count} already downloaded",
+        'archive_menu': "Archive",
+        'archive_import': "Import yt-dlp archive...",
+        'archive_export': "Export yt-dlp archive...",
+        'archive_imported': "Imported {count} entries into the download archive.",
+        'archive_exported': "Exported {count} entries from the download archive.",
+        'message_queued': "Added {count} link(s) to the queue.",
+        'queue_summary': "Active: {active} | Processing: {processing} | Queued: {queued} | Done: {done} | Failed: {failed}",
+        'filter_label': "Filter:",
+        'filter_all': "All",
+        'filter_active': "Active",
+        'bulk_button': "Paste Links...",
+        'bulk_title': "Paste Links",
+        'bulk_resolve': "Fetch Info",
+        'bulk_download': "Download All",
+        'bulk_pending': "Fetching...",
+        'bulk_playlist': "Playlist",
+        'col_duration': "Duration",
+        'col_resolutions': "Resolutions",
+        'col_size': "Est. Size",
+        'bulk_total': "Fetched {done}/{count} | Estimated size: {size}",
+        'bulk_free': "Free space: {free}",
+        'bulk_no_space': "Not enough free space!",
+        'bulk_queue_anyway': "The estimated size is larger than the free space in the download folder. Queue the links anyway?",
+        'subs_menu': "Subscriptions...",
+        'subs_title': "Subscriptions",
+        'subs_add': "Subscribe",
+        'subs_remove': "Remove",
+        'subs_check': "Check Now",
+        'subs_interval': "Every (hours):",
+        'subs_only_new': "Only new uploads",
+        'subs_never': "Never",
+        'subs_hours': "{hours} h",
+        'col_source': "Channel / Playlist",
+        'col_every': "Every",
+        'col_checked': "Last Checked",
+        'col_new': "New",
     },
     'tr': {
         'title': "YouTube İndirici",
@@ -47,6 +119,13 @@ translations = {
         'error_no_link': "Lütfen bir YouTube linki girin.",
         'error_no_folder': "Lütfen indirme klasörünü seçin.",
         'error_download': "İndirme sırasında bir sorun oluştu: ",
+        'error_auth': "Oturum açma veya bot doğrulaması gerekiyor. Çerezleri ~/.config/yt-dlp-gui/cookies.txt dosyasına ekleyip tekrar deneyin.",
+        'error_disk': "İndirme klasöründe yer açıp tekrar deneyin; yarım kalan indirmeler .yt-dlp-gui-temp içinde saklanır.",
+        'error_daemon': "İndirme servisine ulaşılamıyor: ",
+        'message_daemon': "{port} portundaki indirme servisine bağlanıldı.",
+        'site_throttled': "{site} istekleri sınırlıyor; işleri {cooldown} sn bekletiliyor.",
+        'api_disabled': "{port} portundaki yerel API kapatıldı: {error}",
+        'cookies_not_saved': "Çerezler kaydedilemedi: {error}",
         'theme_menu': "Tema",
         'light_theme': "Açık Tema",
         'dark_theme': "Karanlık Tema",
@@ -54,9 +133,72 @@ translations = {
         'download_speed': "Hız:",
         'download_eta': "Kalan:",
         'download_size': "Boyut:",
+        'download_fragments': "Parça:",
         'download_type_label': "İndirme Türü:",
         'type_video': "Video",
-        'type_audio': "Müzik (MP3)",
+        'type_audio': "Müzik",
+        'type_both': "Video + Müzik",
+        'playlist_mode': "Oynatma listesi / Kanal",
+        'playlist_entries': "{count} öğe bulundu",
+        'queue_label': "İndirme Kuyruğu:",
+        'workers_label': "Eşzamanlı indirme:",
+        'fragments_label': "Azami parça:",
+        'audio_format_label': "Ses:",
+        'audio_original': "Orijinal (kopya)",
+        'col_title': "Başlık",
+        'col_type': "Tür",
+        'col_state': "Durum",
+        'col_progress': "İlerleme",
+        'cancel_button': "İptal",
+        'move_up_button': "Yukarı Taşı",
+        'move_down_button': "Aşağı Taşı",
+        'priority_button': "Önce İndir",
+        'limit_label': "Sınır (KB/s):",
+        'state_queued': "Sırada",
+        'state_extracting': "Bilgi alınıyor",
+        'state_downloading': "İndiriliyor",
+        'state_post_processing': "İşleniyor",
+        'state_done': "Tamamlandı",
+        'state_failed': "Başarısız",
+        'state_cancelled': "İptal edildi",
+        'state_skipped': "Zaten indirildi",
+        'playlist_skipped': "{count} tanesi zaten indirildi",
+        'archive_menu': "Arşiv",
+        'archive_import': "yt-dlp arşivini içe aktar...",
+        'archive_export': "yt-dlp arşivini dışa aktar...",
+        'archive_imported': "İndirme arşivine {count} kayıt aktarıldı.",
+        'archive_exported': "İndirme arşivinden {count} kayıt dışa aktarıldı.",
+        'message_queued': "{count} link kuyruğa eklendi.",
+        'queue_summary': "Aktif: {active} | İşleniyor: {processing} | Sırada: {queued} | Biten: {done} | Başarısız: {failed}",
+        'filter_label': "Filtre:",
+        'filter_all': "Tümü",
+        'filter_active': "Aktif",
+        'bulk_button': "Link Yapıştır...",
+        'bulk_title': "Link Yapıştır",
+        'bulk_resolve': "Bilgileri Getir",
+        'bulk_download': "Tümünü İndir",
+        'bulk_pending': "Getiriliyor...",
+        'bulk_playlist': "Oynatma listesi",
+        'col_duration': "Süre",
+        'col_resolutions': "Çözünürlükler",
+        'col_size': "Tahmini Boyut",
+        'bulk_total': "Getirilen {done}/{count} | Tahmini boyut: {size}",
+        'bulk_free': "Boş alan: {free}",
+        'bulk_no_space': "Yeterli boş alan yok!",
+        'bulk_queue_anyway': "Tahmini boyut, indirme klasöründeki boş alandan büyük. Linkler yine de kuyruğa eklensin mi?",
+        'subs_menu': "Abonelikler...",
+        'subs_title': "Abonelikler",
+        'subs_add': "Abone Ol",
+        'subs_remove': "Kaldır",
+        'subs_check': "Şimdi Kontrol Et",
+        'subs_interval': "Her (saat):",
+        'subs_only_new': "Yalnızca yeni yüklemeler",
+        'subs_never': "Hiç",
+        'subs_hours': "{hours} sa",
+        'col_source': "Kanal / Oynatma Listesi",
+        'col_every': "Sıklık",
+        'col_checked': "Son Kontrol",
+        'col_new': "Yeni",
     },
     'ar': {
         'title': "مُنزِّل يوتيوب",
@@ -71,6 +213,13 @@ translations = {
         'error_no_link': "الرجاء إدخال رابط يوتيوب.",
         'error_no_folder': "الرجاء اختيار مجلد التحميل.",
         'error_download': "حدثت مشكلة أثناء التحميل: ",
+        'error_auth': "مطلوب تسجيل الدخول أو التحقق من الروبوت. أضف ملفات تعريف الارتباط إلى ~/.config/yt-dlp-gui/cookies.txt ثم حاول مرة أخرى.",
+        'error_disk': "أفرغ مساحة في مجلد التنزيل ثم حاول مرة أخرى؛ تُحفظ التنزيلات غير المكتملة في .yt-dlp-gui-temp.",
+        'error_daemon': "تعذر الوصول إلى خدمة التحميل: ",
+        'message_daemon': "تم الاتصال بخدمة التحميل على المنفذ {port}.",
+        'site_throttled': "{site} يحد من الطلبات؛ تم إيقاف مهامه مؤقتًا لمدة {cooldown} ثانية.",
+        'api_disabled': "تم تعطيل الواجهة المحلية على المنفذ {port}: {error}",
+        'cookies_not_saved': "تعذر حفظ ملفات تعريف الارتباط: {error}",
         'theme_menu': "السمة",
         'light_theme': "السمة الفاتحة",
         'dark_theme': "السمة الداكنة",
@@ -78,9 +227,72 @@ translations = {
         'download_speed': "السرعة:",
         'download_eta': "الوقت المتبقي:",
         'download_size': "الحجم:",
+        'download_fragments': "الأجزاء:",
         'download_type_label': "نوع التحميل:",
         'type_video': "فيديو",
-        'type_audio': "صوت (MP3)",
+        'type_audio': "صوت",
+        'type_both': "فيديو + صوت",
+        'playlist_mode': "قائمة تشغيل / قناة",
+        'playlist_entries': "تم العثور على {count} عنصر",
+        'queue_label': "قائمة التحميل:",
+        'workers_label': "التحميلات المتزامنة:",
+        'fragments_label': "الحد الأقصى للأجزاء:",
+        'audio_format_label': "الصوت:",
+        'audio_original': "الأصلي (نسخ)",
+        'col_title': "العنوان",
+        'col_type': "النوع",
+        'col_state': "الحالة",
+        'col_progress': "التقدم",
+        'cancel_button': "إلغاء",
+        'move_up_button': "تحريك لأعلى",
+        'move_down_button': "تحريك لأسفل",
+        'priority_button': "تحميل أولاً",
+        'limit_label': "الحد (كيلوبايت/ث):",
+        'state_queued': "في الانتظار",
+        'state_extracting': "جارٍ الاستخراج",
+        'state_downloading': "جارٍ التحميل",
+        'state_post_processing': "جارٍ المعالجة",
+        'state_done': "اكتمل",
+        'state_failed': "فشل",
+        'state_cancelled': "أُلغي",
+        'state_skipped': "تم تحميله مسبقاً",
+        'playlist_skipped': "{count} تم تحميلها مسبقاً",
+        'archive_menu': "الأرشيف",
+        'archive_import': "استيراد أرشيف yt-dlp...",
+        'archive_export': "تصدير أرشيف yt-dlp...",
+        'archive_imported': "تم استيراد {count} عنصر إلى أرشيف التحميل.",
+        'archive_exported': "تم تصدير {count} عنصر من أرشيف التحميل.",
+        'message_queued': "تمت إضافة {count} رابط إلى القائمة.",
+        'queue_summary': "نشط: {active} | قيد المعالجة: {processing} | في الانتظار: {queued} | مكتمل: {done} | فشل: {failed}",
+        'filter_label': "تصفية:",
+        'filter_all': "الكل",
+        'filter_active': "نشط",
+        'bulk_button': "لصق روابط...",
+        'bulk_title': "لصق روابط",
+        'bulk_resolve': "جلب المعلومات",
+        'bulk_download': "تحميل الكل",
+        'bulk_pending': "جارٍ الجلب...",
+        'bulk_playlist': "قائمة تشغيل",
+        'col_duration': "المدة",
+        'col_resolutions': "الدقة",
+        'col_size': "الحجم التقديري",
+        'bulk_total': "تم جلب {done}/{count} | الحجم التقديري: {size}",
+        'bulk_free': "المساحة الحرة: {free}",
+        'bulk_no_space': "لا توجد مساحة حرة كافية!",
+        'bulk_queue_anyway': "الحجم التقديري أكبر من المساحة الحرة في مجلد التحميل. هل تريد إضافة الروابط إلى القائمة على أي حال؟",
+        'subs_menu': "الاشتراكات...",
+        'subs_title': "الاشتراكات",
+        'subs_add': "اشتراك",
+        'subs_remove': "إزالة",
+        'subs_check': "تحقق الآن",
+        'subs_interval': "كل (ساعات):",
+        'subs_only_new': "التحميلات الجديدة فقط",
+        'subs_never': "أبدًا",
+        'subs_hours': "{hours} ساعة",
+        'col_source': "القناة / قائمة التشغيل",
+        'col_every': "التكرار",
+        'col_checked': "آخر تحقق",
+        'col_new': "جديد",
     }
 }
 
@@ -88,6 +300,12 @@ translations = {
 current_lang = 'en'
 current_theme = 'dark'
 
+# How often the main loop redraws jobs that changed (milliseconds)
+UI_REFRESH_MS = 100
+
+# How often the job list is fetched from a download daemon (seconds)
+DAEMON_POLL_INTERVAL = 0.5
+
 # Theme colors
 themes = {
     'light': {
@@ -118,75 +336,9 @@ themes = {
     }
 }
 
-def get_config_path():
-    """Get the configuration file path in ~/.config/yt-dlp-gui folder."""
-    config_dir = os.path.expanduser("~/.config/yt-dlp-gui")
-    
-    try:
-        if not os.path.exists(config_dir):
-            os.makedirs(config_dir)
-    except:
-        import tempfile
-        config_dir = tempfile.gettempdir()
-    
-    return os.path.join(config_dir, "config.json")
-
-def get_cookies_path():
-    """Get the cookies file path for YouTube authentication."""
-    config_dir = os.path.expanduser("~/.config/yt-dlp-gui")
-    try:
-        if not os.path.exists(config_dir):
-            os.makedirs(config_dir)
-    except:
-        pass
-    return os.path.join(config_dir, "cookies.txt")
-
-def load_config():
-    """Load configuration from config file."""
-    config_file = get_config_path()
-    default_config = {
-        'language': 'en',
-        'theme': 'dark'
-    }
-    
-    try:
-        if os.path.exists(config_file):
-            with open(config_file, 'r') as f:
-                config = json.load(f)
-                return config
-    except:
-        pass
-    
-    return default_config
-
-def save_config(language=None, theme=None):
-    """Save configuration to config file."""
-    config_file = get_config_path()
-    config = load_config()
-    
-    if language is not None:
-        config['language'] = language
-    if theme is not None:
-        config['theme'] = theme
-    
-    try:
-        with open(config_file, 'w') as f:
-            json.dump(config, f, indent=2)
-    except:
-        pass
-
-def get_ffmpeg_path():
-    """Find ffmpeg in system PATH."""
-    ffmpeg_path = shutil.which('ffmpeg')
-    return ffmpeg_path if ffmpeg_path else 'ffmpeg'
-
 def check_dependencies():
-    """Check if required dependencies are installed."""
-    missing = []
-    
-    # Check ffmpeg - needed for video merging and audio extraction
-    if not shutil.which('ffmpeg'):
-        missing.append('ffmpeg')
+    """Report missing dependencies found by warm_up (main thread only)."""
+    missing = engine.missing_dependencies
     
     if missing:
         msg = "Missing dependencies:\n\n"
@@ -198,6 +350,31 @@ def check_dependencies():
         return False
     return True
 
+# Startup
+# The window comes up first; the engine warms up (imports yt_dlp) in the background
+startup_times = {}
+
+def warm_up():
+    """Warm up the engine on a background thread and note when it is ready."""
+    engine.warm_up()
+    startup_times['ready'] = time.perf_counter() - STARTUP_STARTED
+
+def mark_window_shown(event=None):
+    """Record how long it took until the window was first mapped."""
+    if 'window' not in startup_times:
+        startup_times['window'] = time.perf_counter() - STARTUP_STARTED
+
+def on_engine_ready():
+    """Finish startup on the main loop once warm_up is done."""
+    if not engine.engine_ready.is_set() or 'window' not in startup_times:
+        root.after(UI_REFRESH_MS, on_engine_ready)
+        return
+    print(f"Startup: window shown after {startup_times['window']:.2f}s, "
+          f"ready after {startup_times['ready']:.2f}s")
+    if not check_dependencies():
+        root.destroy()
+        exit(1)
+
 def apply_theme():
     """Applies the current theme to all widgets."""
     theme = themes[current_theme]
@@ -212,8 +389,21 @@ def apply_theme():
     
     # New audio/video type labels and radio buttons
     download_type_label.configure(bg=theme['frame_bg'], fg=theme['fg'])
+    queue_label.configure(bg=theme['frame_bg'], fg=theme['fg'])
+    workers_label.configure(bg=theme['frame_bg'], fg=theme['fg'])
+    fragments_label.configure(bg=theme['frame_bg'], fg=theme['fg'])
+    audio_format_label.configure(bg=theme['frame_bg'], fg=theme['fg'])
+    limit_label.configure(bg=theme['frame_bg'], fg=theme['fg'])
+    filter_label.configure(bg=theme['frame_bg'], fg=theme['fg'])
+    filter_frame.configure(bg=theme['frame_bg'])
+    filter_entry.configure(bg=theme['entry_bg'], fg=theme['entry_fg'], insertbackground=theme['entry_fg'])
+    settings_frame.configure(bg=theme['frame_bg'])
+    queue_buttons.configure(bg=theme['frame_bg'])
     video_radio.configure(bg=theme['radio_bg'], fg=theme['radio_fg'], selectcolor=theme['radio_bg'], activebackground=theme['radio_bg'], activeforeground=theme['radio_fg'])
     audio_radio.configure(bg=theme['radio_bg'], fg=theme['radio_fg'], selectcolor=theme['radio_bg'], activebackground=theme['radio_bg'], activeforeground=theme['radio_fg'])
+    both_radio.configure(bg=theme['radio_bg'], fg=theme['radio_fg'], selectcolor=theme['radio_bg'], activebackground=theme['radio_bg'], activeforeground=theme['radio_fg'])
+    type_frame.configure(bg=theme['frame_bg'])
+    playlist_check.configure(bg=theme['radio_bg'], fg=theme['radio_fg'], selectcolor=theme['radio_bg'], activebackground=theme['radio_bg'], activeforeground=theme['radio_fg'])
     
     link_entry.configure(bg=theme['entry_bg'], fg=theme['entry_fg'], 
                          insertbackground=theme['entry_fg'])
@@ -222,6 +412,15 @@ def apply_theme():
                             activebackground=theme['button_active_bg'])
     indir_button.configure(bg=theme['button_bg'], fg=theme['button_fg'],
                             activebackground=theme['button_active_bg'])
+    bulk_button.configure(bg=theme['button_bg'], fg=theme['button_fg'],
+                          activebackground=theme['button_active_bg'])
+    for button in (cancel_button, move_up_button, move_down_button, priority_button):
+        button.configure(bg=theme['button_bg'], fg=theme['button_fg'],
+                         activebackground=theme['button_active_bg'])
+    for spinbox in (workers_spinbox, fragments_spinbox, limit_spinbox):
+        spinbox.configure(bg=theme['entry_bg'], fg=theme['entry_fg'],
+                          buttonbackground=theme['button_bg'],
+                          insertbackground=theme['entry_fg'])
     
     style = ttk.Style()
     if current_theme == 'dark':
@@ -237,19 +436,30 @@ def apply_theme():
         style.configure("TProgressbar",
                         background='#0066cc',
                         troughcolor='#f0f0f0')
+    style.configure("TCombobox",
+                    fieldbackground=theme['entry_bg'],
+                    foreground=theme['entry_fg'])
+    style.configure("Treeview",
+                    background=theme['entry_bg'],
+                    fieldbackground=theme['entry_bg'],
+                    foreground=theme['entry_fg'],
+                    rowheight=JOB_ROW_HEIGHT)
+    style.configure("Treeview.Heading",
+                    background=theme['button_bg'],
+                    foreground=theme['button_fg'])
 
 def set_theme(theme):
     """Changes the application theme."""
     global current_theme
     current_theme = theme
-    save_config(theme=theme)
+    engine.save_config(theme=theme)
     apply_theme()
 
 def set_language(lang):
     """Changes the application language and updates the interface."""
     global current_lang
     current_lang = lang
-    save_config(language=lang)
+    engine.save_config(language=lang)
     update_interface()
 
 def update_interface():
@@ -263,12 +473,36 @@ def update_interface():
     if not download_path:
         path_label.config(text=t['path_label_default'])
     indir_button.config(text=t['download_button'])
+    bulk_button.config(text=t['bulk_button'])
     message_label.config(text="")
     
     # Update new labels/buttons
     download_type_label.config(text=t['download_type_label'])
     video_radio.config(text=t['type_video'])
     audio_radio.config(text=t['type_audio'])
+    both_radio.config(text=t['type_both'])
+    playlist_check.config(text=t['playlist_mode'])
+    
+    # Update queue widgets
+    queue_label.config(text=t['queue_label'])
+    workers_label.config(text=t['workers_label'])
+    fragments_label.config(text=t['fragments_label'])
+    audio_format_label.config(text=t['audio_format_label'])
+    audio_format_combo.config(values=audio_format_names())
+    audio_format_combo.current(engine.AUDIO_FORMATS.index(engine.audio_format))
+    cancel_button.config(text=t['cancel_button'])
+    move_up_button.config(text=t['move_up_button'])
+    move_down_button.config(text=t['move_down_button'])
+    priority_button.config(text=t['priority_button'])
+    limit_label.config(text=t['limit_label'])
+    for column in ('title', 'type', 'state', 'progress'):
+        job_tree.heading(column, text=t['col_' + column])
+    filter_label.config(text=t['filter_label'])
+    state_filter_combo.config(values=state_filter_names())
+    state_filter_combo.current(state_filter_combo.current())
+    for row_id in job_tree.get_children():
+        update_job_row(engine.jobs[int(row_id)])
+    update_queue_summary()
     
     # Update menu bar label (needs a special approach for tkinter Menu)
     theme_menu_label = t['theme_menu']
@@ -283,6 +517,18 @@ def update_interface():
                 break
         except:
             continue
+    
+    archive_labels = [strings['archive_menu'] for strings in translations.values()]
+    for i in range(menu_bar.index("end") + 1):
+        try:
+            if menu_bar.entrycget(i, "label") in archive_labels:
+                menu_bar.entryconfig(i, label=t['archive_menu'])
+                archive_menu.entryconfig(0, label=t['archive_import'])
+                archive_menu.entryconfig(1, label=t['archive_export'])
+                archive_menu.entryconfig(3, label=t['subs_menu'])
+                break
+        except:
+            continue
 
 def klasor_sec():
     """Allows user to select download folder."""
@@ -296,168 +542,270 @@ def update_progress_bar(progress_text, progress_value=0):
     """Update progress bar and progress label."""
     progress_label.config(text=progress_text)
     progress_bar['value'] = progress_value
-    root.update_idletasks()
 
-def progress_hook(d):
-    """Progress hook for yt-dlp."""
-    t = translations[current_lang]
-    
-    if d['status'] == 'downloading':
+# Ids of jobs that changed since the last redraw; filled by any thread,
+# drained only by the Tk main loop (see process_ui_events)
+ui_events = queue.SimpleQueue()
+engine.job_listeners.append(lambda job: ui_events.put(job['id']))
+# Engine notices as (key, fields), shown in the message line by the same loop
+ui_messages = queue.SimpleQueue()
+engine.message_listeners.append(lambda key, fields: ui_messages.put((key, fields)))
+
+# Daemon client
+# With "use_daemon" in config.json and a daemon running (yt-dlp-cli.py --daemon),
+# the GUI only submits and controls jobs and the daemon downloads them. Its jobs
+# are mirrored into engine.jobs, so the job list is drawn the same way.
+daemon_port = None
+
+def daemon_request(method, path, payload=None):
+    """Call the daemon's job API and return its decoded JSON answer."""
+    connection = http.client.HTTPConnection('127.0.0.1', daemon_port, timeout=5)
+    try:
+        body = json.dumps(payload) if payload is not None else None
+        connection.request(method, path, body, {'Content-Type': 'application/json',
+                                                engine.API_TOKEN_HEADER: engine.get_api_token() or ''})
+        response = connection.getresponse()
+        answer = response.read()
+        if response.status != 200:
+            raise OSError(f"{response.status} {response.reason}")
+        return json.loads(answer)
+    finally:
+        connection.close()
+
+def connect_daemon(port):
+    """Become a client of the daemon on `port` if it answers."""
+    global daemon_port
+    daemon_port = port
+    try:
+        daemon_request('GET', '/jobs?since=0')
+    except (OSError, ValueError):
+        daemon_port = None
+        return False
+    threading.Thread(target=poll_daemon, daemon=True).start()
+    return True
+
+def poll_daemon():
+    """Mirror the jobs of the daemon into engine.jobs (background thread)."""
+    version = 0
+    while True:
         try:
-            # Get percentage
-            if 'total_bytes' in d and d['total_bytes'] > 0:
-                percentage = (d['downloaded_bytes'] / d['total_bytes']) * 100
-            elif 'total_bytes_estimate' in d and d['total_bytes_estimate'] > 0:
-                percentage = (d['downloaded_bytes'] / d['total_bytes_estimate']) * 100
-            else:
-                percentage = 0
-            
-            # Get speed
-            speed = d.get('speed', 0)
-            if speed:
-                if speed > 1024 * 1024:
-                    speed_str = f"{speed / (1024 * 1024):.2f} MiB/s"
-                elif speed > 1024:
-                    speed_str = f"{speed / 1024:.2f} KiB/s"
-                else:
-                    speed_str = f"{speed:.2f} B/s"
-            else:
-                speed_str = "Unknown"
-            
-            # Get ETA
-            eta = d.get('eta', 0)
-            if eta:
-                eta_str = f"{eta}s"
-            else:
-                eta_str = "Unknown"
-            
-            # Update progress
-            progress_text = f"{t['download_progress']} {percentage:.1f}%"
-            if speed_str != "Unknown":
-                progress_text += f" | {t['download_speed']} {speed_str}"
-            if eta_str != "Unknown":
-                progress_text += f" | {t['download_eta']} {eta_str}"
-            
-            update_progress_bar(progress_text, percentage)
-            
-        except Exception as e:
-            pass
-    
-    elif d['status'] == 'finished':
-        update_progress_bar(f"{t['download_progress']} 100% - Finalizing...", 100)
+            answer = daemon_request('GET', f'/jobs?since={version}')
+        except (OSError, ValueError):
+            time.sleep(DAEMON_POLL_INTERVAL)
+            continue
+        version = answer['version']
+        for snapshot in answer['jobs']:
+            with engine.queue_cond:
+                engine.jobs[snapshot['id']] = snapshot
+            ui_events.put(snapshot['id'])
+        time.sleep(DAEMON_POLL_INTERVAL)
+
+def daemon_action(job_id, action, result_key=None):
+    """Run a queue action on the daemon; returns the answer's `result_key` value."""
+    try:
+        answer = daemon_request('POST', f'/jobs/{job_id}/{action}')
+    except (OSError, ValueError) as e:
+        message_label.config(text=translations[current_lang]['error_daemon'] + str(e))
+        return None
+    return answer.get(result_key) if result_key else None
 
-def run_download(link, download_type):
-    """Runs download process using yt-dlp library, supporting video and audio.
+def process_ui_events():
+    """Redraw the jobs that changed since the last frame, then schedule the next frame.
     
-    MP3 uzantısının iki kez eklenmesi sorununu çözmek için:
-    Audio (ses) indirmelerde, çıktı şablonunda uzantıyı (% (ext) s) kullanmayız, 
-    böylece post-processor (FFmpegExtractAudio) tek bir .mp3 uzantısı ekler.
+    Runs on the Tk main loop. Many progress callbacks for the same job are
+    coalesced into one redraw showing its latest values, so the widget work
+    per frame depends on the number of jobs and not on the callback rate.
     """
-    t = translations[current_lang]
-    
+    changed = {}
     try:
-        # Determine output template and format based on download type
-        if download_type == 'video':
-            # Video: Uzantı şablonda tutulur.
-            output_template = os.path.join(download_path, "%(title)s.%(ext)s")
-            ydl_format = 'best[height<=1080]/best'
-            merge_format = 'mp4'
-        elif download_type == 'audio':
-            # Audio: Uzantı şablondan kaldırılır. Post-processor MP3'e dönüştürürken 
-            # uzantıyı kendisi ekleyecektir.
-            output_template = os.path.join(download_path, "%(title)s") 
-            ydl_format = 'bestaudio/best'
-            merge_format = None
-        else: # Default to video for safety
-            output_template = os.path.join(download_path, "%(title)s.%(ext)s")
-            ydl_format = 'best[height<=1080]/best'
-            merge_format = 'mp4'
-            
-        update_progress_bar(t['message_downloading'], 0)
-        
-        # Get ffmpeg path
-        ffmpeg_location = get_ffmpeg_path()
-        
-        ydl_opts = {
-            'format': ydl_format,
-            'outtmpl': output_template, # Yukarıda belirlenen şablon kullanılır
-            'progress_hooks': [progress_hook],
-            'nocheckcertificate': True,
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'extractor_args': {'youtube': {'player_client': ['android', 'web']}},
-            'cookiefile': None,
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-us,en;q=0.5',
-                'Sec-Fetch-Mode': 'navigate',
-            }
-        }
-        
-        # Post-processing for audio (extract audio and convert to mp3)
-        if download_type == 'audio':
-            ydl_opts['postprocessors'] = [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192', # High quality MP3
-            }]
-            ydl_opts['format'] = 'bestaudio/best' # Ensure best audio is used
-            # outtmpl zaten "%(title)s" olarak ayarlandı, bu sayede tek uzantı eklenir.
-
-        # Add merge output format for video download
-        if download_type == 'video':
-            ydl_opts['merge_output_format'] = merge_format
-        
-        # Add ffmpeg location if found
-        if ffmpeg_location:
-            ydl_opts['ffmpeg_location'] = ffmpeg_location
-        
-        # Add cookies if file exists (helps with bot detection)
-        cookies_file = get_cookies_path()
-        if os.path.exists(cookies_file):
-            ydl_opts['cookiefile'] = cookies_file
-        
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([link])
-            
-            update_progress_bar("Download completed successfully!", 100)
-            messagebox.showinfo(t['message_success_title'], t['message_success_body'])
-            
-        except Exception as e:
-            # Fallback for video if first format fails
-            if download_type == 'video':
-                update_progress_bar("Trying alternative format...", 0)
-                
-                ydl_opts['format'] = 'worst[height>=480]/worst'
-                
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([link])
-                
-                update_progress_bar("Download completed successfully!", 100)
-                messagebox.showinfo(t['message_success_title'], t['message_success_body'])
-            else:
-                raise # Re-raise error if not a video fallback scenario
-        
-    except Exception as e:
-        update_progress_bar("Download failed!", 0)
-        # Attempt to clean up the error message for better readability
-        error_msg = str(e).split('\n')[0] 
-        messagebox.showerror(t['error_title'], f"{t['error_download']}{error_msg}")
-    
-    indir_button.config(state=tk.NORMAL)
-    root.after(3000, lambda: update_progress_bar("", 0))
+        while True:
+            changed[ui_events.get_nowait()] = None
+    except queue.Empty:
+        pass
+    try:
+        while True:
+            key, fields = ui_messages.get_nowait()
+            text = translations[current_lang].get(key, engine.MESSAGES[key])
+            message_label.config(text=text.format(**fields))
+    except queue.Empty:
+        pass
+    
+    if changed:
+        new_ids = sorted(job_id for job_id in changed if job_id not in listed_jobs)
+        listed_jobs.update(new_ids)
+        job_order.extend(new_ids)
+        if filtered_ids is not job_order and any(
+                job_matches_filter(engine.jobs[job_id]) != (job_id in filtered_members) for job_id in changed):
+            apply_job_filter()
+        else:
+            render_job_rows()
+        for job_id in changed:
+            update_job_row(engine.jobs[job_id])
+        update_queue_summary()
+    
+    root.after(UI_REFRESH_MS, process_ui_events)
+
+# Job list
+# The list is virtual: `job_order` holds every job id in display order and
+# `filtered_ids` those that match the filter, while the Treeview only holds
+# the rows that fit on screen. Scrolling and filtering refill those rows, and
+# every frame redraws only visible rows of jobs that changed, so the list stays
+# responsive with tens of thousands of jobs.
+JOB_ROW_HEIGHT = 22
+JOB_HEADING_HEIGHT = 28
+JOB_STATE_FILTERS = (
+    ('filter_all', None),
+    ('filter_active', engine.ACTIVE_STATES),
+    ('state_queued', ('queued',)),
+    ('state_done', ('done', 'skipped')),
+    ('state_failed', ('failed',)),
+)
+job_order = []
+listed_jobs = set()
+filtered_ids = job_order    # the same list while no filter is set
+filtered_members = set()
+view_top = 0
+visible_rows = 8
+selected_ids = set()
+
+def state_filter_names():
+    t = translations[current_lang]
+    return [t[key] for key, states in JOB_STATE_FILTERS]
+
+def job_matches_filter(job):
+    """Check a job against the text and state filter."""
+    states = JOB_STATE_FILTERS[max(0, state_filter_combo.current())][1]
+    if states is not None and job['state'] not in states:
+        return False
+    text = job_filter_var.get().strip().lower()
+    return not text or text in job['title'].lower() or text in job['url'].lower()
+
+def on_filter_changed(*args):
+    """Filter entry/combobox callback: show the matching jobs from the top."""
+    global view_top
+    view_top = 0
+    apply_job_filter()
+
+def apply_job_filter():
+    """Rebuild the filtered job list and show it."""
+    global filtered_ids, filtered_members
+    if not job_filter_var.get().strip() and state_filter_combo.current() <= 0:
+        filtered_ids = job_order
+        filtered_members = set()
+    else:
+        filtered_ids = [job_id for job_id in job_order if job_matches_filter(engine.jobs[job_id])]
+        filtered_members = set(filtered_ids)
+    render_job_rows()
+
+def render_job_rows():
+    """Fill the Treeview with the visible slice of the filtered jobs."""
+    global view_top
+    view_top = max(0, min(view_top, len(filtered_ids) - visible_rows))
+    shown = filtered_ids[view_top:view_top + visible_rows]
+    row_ids = [str(job_id) for job_id in shown]
+    if list(job_tree.get_children()) != row_ids:
+        job_tree.delete(*job_tree.get_children())
+        for job_id in shown:
+            job_tree.insert('', 'end', iid=str(job_id), values=job_row_values(engine.jobs[job_id]))
+        job_tree.selection_set([str(job_id) for job_id in shown if job_id in selected_ids])
+    total = len(filtered_ids)
+    if total:
+        job_scrollbar.set(view_top / total, min(1.0, (view_top + visible_rows) / total))
+    else:
+        job_scrollbar.set(0, 1)
+
+def scroll_jobs_to(top):
+    global view_top
+    view_top = top
+    render_job_rows()
+
+def on_job_scroll(action, amount, unit=None):
+    """Scrollbar command: 'moveto <fraction>' or 'scroll <n> units|pages'."""
+    if action == 'moveto':
+        scroll_jobs_to(int(float(amount) * len(filtered_ids)))
+    elif action == 'scroll':
+        step = visible_rows if unit == 'pages' else 1
+        scroll_jobs_to(view_top + int(amount) * step)
+
+def on_job_wheel(event):
+    """Scroll the job list with the mouse wheel (Button-4/5 on X11)."""
+    scroll_jobs_to(view_top + (-3 if event.num == 4 or event.delta > 0 else 3))
+    return "break"
+
+def on_job_tree_resized(event):
+    """Show as many rows as fit into the list."""
+    global visible_rows
+    rows = max(1, (event.height - JOB_HEADING_HEIGHT) // JOB_ROW_HEIGHT)
+    if rows != visible_rows:
+        visible_rows = rows
+        render_job_rows()
+
+def on_job_selection_changed(event=None):
+    """Keep the selection of jobs that are scrolled out of view."""
+    global selected_ids
+    shown = {int(row_id) for row_id in job_tree.get_children()}
+    selected_ids = (selected_ids - shown) | {int(row_id) for row_id in job_tree.selection()}
+
+def update_job_row(job):
+    """Redraw a job's row if it is visible. Must run on the Tk main loop."""
+    row_id = str(job['id'])
+    if job_tree.exists(row_id):
+        job_tree.item(row_id, values=job_row_values(job))
+
+def job_row_values(job):
+    """Column values showing the current state of a job in the queue list."""
+    t = translations[current_lang]
+    state_text = t['state_' + job['state'].replace('-', '_')]
+    if job['state'] == 'failed' and job['error']:
+        state_text += f": {job['error']}"
+        if job['error_kind'] == 'auth':
+            state_text += " - " + t['error_auth']
+        elif job['error_kind'] == 'disk':
+            state_text += " - " + t['error_disk']
+    elif job['state'] == 'downloading':
+        # Speed and ETA are formatted here, once per frame, not in progress_hook
+        if job['speed']:
+            state_text += f" | {t['download_speed']} {engine.format_speed(job['speed'])}"
+        if job['eta']:
+            state_text += f" | {t['download_eta']} {job['eta']}s"
+        if job['fragmented'] and job['fragments']:
+            state_text += f" | {t['download_fragments']} {job['fragments']}"
+    elif job['playlist'] and job['state'] != 'cancelled':
+        state_text += f" - {t['playlist_entries'].format(count=job['entries'])}"
+        if job['skipped']:
+            state_text += f", {t['playlist_skipped'].format(count=job['skipped'])}"
+    elif (job['state'] in engine.ACTIVE_STATES or job['state'] == 'queued') and job['status_text']:
+        # Queued jobs have a status text while their site is paused for rate limiting
+        state_text += f" - {job['status_text']}"
+    title = "⚡ " + job['title'] if job['priority'] == 'high' else job['title']
+    return (title, t['type_' + job['type']], state_text, f"{job['progress']:.1f}%")
+
+def update_queue_summary():
+    """Show overall queue counters and the average progress of running jobs."""
+    t = translations[current_lang]
+    with engine.queue_cond:
+        states = [job['state'] for job in engine.jobs.values()]
+        active = [job['progress'] for job in engine.jobs.values() if job['state'] in engine.ACTIVE_STATES]
+    summary = t['queue_summary'].format(
+        active=len(active) - states.count('post-processing'),
+        processing=states.count('post-processing'),
+        queued=states.count('queued'),
+        done=states.count('done') + states.count('skipped'),
+        failed=states.count('failed'),
+    )
+    update_progress_bar(summary, sum(active) / len(active) if active else 0)
 
 def indir_video():
-    """Function that starts the download process."""
+    """Function that adds the entered link(s) to the download queue."""
     t = translations[current_lang]
     global download_path
-    video_link = link_entry.get()
+    # Several links can be pasted at once, separated by spaces or newlines
+    video_links = link_entry.get().split()
     
-    # Get the selected download type ('video' or 'audio')
+    # Get the selected download type ('video', 'audio' or 'both')
     download_type = download_type_var.get()
     
-    if not video_link:
+    if not video_links:
         messagebox.showerror(t['error_title'], t['error_no_link'])
         return
 
@@ -465,22 +813,380 @@ def indir_video():
         messagebox.showerror(t['error_title'], t['error_no_folder'])
         return
 
-    indir_button.config(state=tk.DISABLED)
-    message_label.config(text=t['message_downloading'])
+    if not queue_links(video_links, download_type, playlist_var.get()):
+        return
     
-    download_thread = threading.Thread(target=run_download, args=(video_link, download_type,))
-    download_thread.daemon = True
-    download_thread.start()
+    link_entry.delete(0, tk.END)
+    message_label.config(text=t['message_queued'].format(count=len(video_links)))
+
+def queue_links(links, download_type, playlist_mode):
+    """Queue links into download_path, here or on the daemon. Returns False if that failed."""
+    t = translations[current_lang]
+    if daemon_port is not None:
+        try:
+            # The daemon would use its own audio format otherwise
+            daemon_request('POST', '/jobs', {'urls': links, 'type': download_type,
+                                             'audio_format': engine.audio_format,
+                                             'folder': download_path, 'playlist': playlist_mode})
+        except (OSError, ValueError) as e:
+            messagebox.showerror(t['error_title'], t['error_daemon'] + str(e))
+            return False
+    else:
+        for link in links:
+            engine.submit_job(link, download_type, download_path, playlist_mode)
+    return True
+
+def format_duration(seconds):
+    """Format a duration in seconds as h:mm:ss or m:ss."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def bulk_row(summary):
+    """Table values of a resolved link in the bulk paste dialog."""
+    t = translations[current_lang]
+    if summary.get('error'):
+        return (summary['url'], "", "", f"{t['state_failed']}: {summary['error']}")
+    if summary['playlist']:
+        entries = t['playlist_entries'].format(count=summary['entries']) if 'entries' in summary else ""
+        return (summary['title'] or summary['url'], t['bulk_playlist'], entries, "?")
+    duration = format_duration(summary['duration']) if summary['duration'] else ""
+    resolutions = ", ".join(f"{height}p" for height in summary['resolutions'][:4])
+    size = engine.format_size(summary['size']) if summary['size'] else "?"
+    return (summary['title'] or summary['url'], duration, resolutions, size)
+
+def open_bulk_paste():
+    """Dialog that resolves a batch of pasted links in parallel and shows their
+    metadata, total size and whether they fit on disk before they are queued."""
+    t = translations[current_lang]
+    theme = themes[current_theme]
+    dialog = tk.Toplevel(root)
+    dialog.title(t['bulk_title'])
+    dialog.geometry("760x480")
+    dialog.configure(bg=theme['frame_bg'])
+    
+    links_text = tk.Text(dialog, height=6, font=("Arial", 10), bg=theme['entry_bg'], fg=theme['entry_fg'],
+                         insertbackground=theme['entry_fg'])
+    links_text.pack(fill="x", padx=10, pady=(10, 5))
+    links_text.insert('1.0', "\n".join(link_entry.get().split()))
+    
+    buttons = tk.Frame(dialog, bg=theme['frame_bg'])
+    buttons.pack(fill="x", padx=10)
+    
+    table = ttk.Treeview(dialog, columns=('title', 'duration', 'resolutions', 'size'), show='headings', height=10)
+    for column, width in (('title', 340), ('duration', 80), ('resolutions', 170), ('size', 110)):
+        table.heading(column, text=t['col_' + column])
+        table.column(column, width=width)
+    table.pack(fill="both", expand=True, padx=10, pady=5)
+    
+    total_label = tk.Label(dialog, text="", font=("Arial", 9), bg=theme['frame_bg'], fg=theme['message_fg'])
+    total_label.pack(pady=(0, 10))
+    
+    # Results arrive on the prefetch threads; the cancel event of the current
+    # run also tells its results apart from those of an earlier run
+    results = queue.SimpleQueue()
+    batch = {'links': [], 'summaries': {}, 'type': None, 'cancel': None, 'fits': True}
+    
+    def resolve():
+        links = [word for word in links_text.get('1.0', tk.END).split()
+                 if word.startswith(('http://', 'https://'))]
+        if not links:
+            messagebox.showerror(t['error_title'], t['error_no_link'], parent=dialog)
+            return
+        if batch['cancel'] is not None:
+            batch['cancel'].set()
+        cancel = threading.Event()
+        batch.update(links=links, summaries={}, type=download_type_var.get(), cancel=cancel)
+        table.delete(*table.get_children())
+        for index, link in enumerate(links):
+            table.insert('', 'end', iid=str(index), values=(link, "", "", t['bulk_pending']))
+        download_button.config(state='normal')
+        update_total()
+        engine.prefetch_metadata(links, batch['type'],
+                                 lambda index, summary: results.put((cancel, index, summary)), cancel)
+    
+    def update_total():
+        summaries = batch['summaries'].values()
+        sizes = [summary.get('size') for summary in summaries if not summary.get('error')]
+        total = sum(size for size in sizes if size)
+        text = t['bulk_total'].format(done=len(batch['summaries']), count=len(batch['links']),
+                                      size=engine.format_size(total))
+        if None in sizes:
+            text += " (+?)"
+        # Checked the way the engine admits each download: conversions need more than
+        # the download, a margin stays free, running downloads keep their space
+        free = engine.usable_disk_space(download_path) if download_path else None
+        batch['fits'] = free is None or engine.disk_space_needed(total, batch['type']) <= free
+        if free is not None:
+            text += " | " + t['bulk_free'].format(free=engine.format_size(free))
+        if not batch['fits']:
+            text += " - " + t['bulk_no_space']
+        total_label.config(text=text, fg=theme['message_fg'] if batch['fits'] else 'red')
+    
+    def show_results():
+        if not dialog.winfo_exists():
+            return
+        changed = False
+        try:
+            while True:
+                cancel, index, summary = results.get_nowait()
+                if cancel is batch['cancel']:
+                    batch['summaries'][index] = summary
+                    table.item(str(index), values=bulk_row(summary))
+                    changed = True
+        except queue.Empty:
+            pass
+        if changed:
+            update_total()
+        dialog.after(UI_REFRESH_MS, show_results)
+    
+    def download_all():
+        if not download_path:
+            messagebox.showerror(t['error_title'], t['error_no_folder'], parent=dialog)
+            return
+        update_total()
+        if not batch['fits'] and not messagebox.askyesno(t['bulk_title'], t['bulk_queue_anyway'], parent=dialog):
+            return
+        # Links that failed to resolve are left out; those still resolving are queued as they are
+        summaries = [batch['summaries'].get(index, {}) for index in range(len(batch['links']))]
+        videos = [link for link, summary in zip(batch['links'], summaries)
+                  if not summary.get('error') and not summary.get('playlist')]
+        playlists = [link for link, summary in zip(batch['links'], summaries) if summary.get('playlist')]
+        if videos and not queue_links(videos, batch['type'], False):
+            return
+        if playlists and not queue_links(playlists, batch['type'], True):
+            return
+        message_label.config(text=t['message_queued'].format(count=len(videos) + len(playlists)))
+        close()
+    
+    def close():
+        if batch['cancel'] is not None:
+            batch['cancel'].set()
+        dialog.destroy()
+    
+    resolve_button = tk.Button(buttons, text=t['bulk_resolve'], command=resolve, font=("Arial", 10),
+                               bg=theme['button_bg'], fg=theme['button_fg'], activebackground=theme['button_active_bg'])
+    resolve_button.pack(side="left")
+    download_button = tk.Button(buttons, text=t['bulk_download'], command=download_all, font=("Arial", 10),
+                                state='disabled', bg=theme['button_bg'], fg=theme['button_fg'],
+                                activebackground=theme['button_active_bg'])
+    download_button.pack(side="left", padx=(5, 0))
+    
+    dialog.protocol("WM_DELETE_WINDOW", close)
+    dialog.after(UI_REFRESH_MS, show_results)
+    if links_text.get('1.0', tk.END).strip():
+        resolve()
+
+def subscription_row(subscription):
+    """Table values of a subscription in the subscriptions dialog."""
+    t = translations[current_lang]
+    if subscription['last_checked']:
+        checked = time.strftime('%Y-%m-%d %H:%M', time.localtime(subscription['last_checked']))
+    else:
+        checked = t['subs_never']
+    new = f"{t['state_failed']}: {subscription['last_error']}" if subscription['last_error'] else subscription['last_new']
+    return (subscription['title'] or subscription['url'], t['type_' + subscription['type']],
+            t['subs_hours'].format(hours=subscription['interval_hours']), checked, new)
+
+def open_subscriptions():
+    """Dialog to add, remove and check the subscribed channels and playlists.
+    
+    New subscriptions use the download type of the main window and the
+    selected download folder.
+    """
+    t = translations[current_lang]
+    theme = themes[current_theme]
+    dialog = tk.Toplevel(root)
+    dialog.title(t['subs_title'])
+    dialog.geometry("760x420")
+    dialog.configure(bg=theme['frame_bg'])
+    
+    add_frame = tk.Frame(dialog, bg=theme['frame_bg'])
+    add_frame.pack(fill="x", padx=10, pady=(10, 5))
+    url_entry = tk.Entry(add_frame, width=50, font=("Arial", 10), bg=theme['entry_bg'], fg=theme['entry_fg'],
+                         insertbackground=theme['entry_fg'])
+    url_entry.pack(side="left", fill="x", expand=True)
+    url_entry.insert(0, link_entry.get().strip())
+    tk.Label(add_frame, text=t['subs_interval'], font=("Arial", 9), bg=theme['frame_bg'],
+             fg=theme['fg']).pack(side="left", padx=(8, 2))
+    interval_var = tk.StringVar(value=str(engine.DEFAULT_SUBSCRIPTION_HOURS))
+    tk.Spinbox(add_frame, from_=1, to=720, width=4, textvariable=interval_var, font=("Arial", 9),
+               bg=theme['entry_bg'], fg=theme['entry_fg']).pack(side="left")
+    only_new_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(add_frame, text=t['subs_only_new'], variable=only_new_var, font=("Arial", 9),
+                   bg=theme['radio_bg'], fg=theme['radio_fg'], selectcolor=theme['entry_bg'],
+                   activebackground=theme['radio_bg']).pack(side="left", padx=(8, 0))
+    
+    table = ttk.Treeview(dialog, columns=('source', 'type', 'every', 'checked', 'new'), show='headings', height=10)
+    for column, width in (('source', 300), ('type', 80), ('every', 70), ('checked', 130), ('new', 150)):
+        table.heading(column, text=t['col_' + column])
+        table.column(column, width=width)
+    table.pack(fill="both", expand=True, padx=10, pady=5)
+    
+    buttons = tk.Frame(dialog, bg=theme['frame_bg'])
+    buttons.pack(fill="x", padx=10, pady=(0, 10))
+    
+    def refresh():
+        if not dialog.winfo_exists():
+            return
+        selected = set(table.selection())
+        table.delete(*table.get_children())
+        for subscription in engine.list_subscriptions():
+            table.insert('', 'end', iid=subscription['id'], values=subscription_row(subscription))
+        table.selection_set([iid for iid in selected if table.exists(iid)])
+        # Checks started by the scheduler show up without reopening the dialog
+        dialog.after(2000, refresh)
+    
+    def add():
+        url = url_entry.get().strip()
+        if not url.startswith(('http://', 'https://')):
+            messagebox.showerror(t['error_title'], t['error_no_link'], parent=dialog)
+            return
+        if not download_path:
+            messagebox.showerror(t['error_title'], t['error_no_folder'], parent=dialog)
+            return
+        try:
+            interval = max(1, int(interval_var.get()))
+        except ValueError:
+            interval = engine.DEFAULT_SUBSCRIPTION_HOURS
+        subscription = engine.add_subscription(url, download_type_var.get(), download_path, interval,
+                                               only_new_var.get())
+        url_entry.delete(0, tk.END)
+        table.insert('', 'end', iid=subscription['id'], values=subscription_row(subscription))
+        if daemon_port is None:
+            engine.check_subscription(subscription['id'])
+    
+    def remove():
+        for subscription_id in table.selection():
+            engine.remove_subscription(subscription_id)
+            table.delete(subscription_id)
+    
+    def check_now():
+        for subscription_id in table.selection():
+            engine.check_subscription(subscription_id)
+    
+    for text, command in ((t['subs_add'], add), (t['subs_remove'], remove), (t['subs_check'], check_now)):
+        button = tk.Button(buttons, text=text, command=command, font=("Arial", 10), bg=theme['button_bg'],
+                           fg=theme['button_fg'], activebackground=theme['button_active_bg'])
+        button.pack(side="left", padx=(0, 5))
+        # A daemon checks the subscriptions itself; this window only edits the list
+        if command is check_now and daemon_port is not None:
+            button.config(state='disabled')
+    
+    refresh()
+
+def import_archive():
+    """Import a yt-dlp archive file for the currently selected download type."""
+    t = translations[current_lang]
+    path = filedialog.askopenfilename(filetypes=[("Text files", "*.txt"), ("All files", "*")])
+    if not path:
+        return
+    try:
+        count = engine.import_archive_file(path, download_type_var.get())
+        message_label.config(text=t['archive_imported'].format(count=count))
+    except (OSError, UnicodeDecodeError, sqlite3.Error) as e:
+        messagebox.showerror(t['error_title'], str(e))
+
+def export_archive():
+    """Export the download archive as a yt-dlp archive file."""
+    t = translations[current_lang]
+    path = filedialog.asksaveasfilename(defaultextension=".txt", initialfile="archive.txt")
+    if not path:
+        return
+    try:
+        count = engine.export_archive_file(path)
+        message_label.config(text=t['archive_exported'].format(count=count))
+    except (OSError, sqlite3.Error) as e:
+        messagebox.showerror(t['error_title'], str(e))
+
+def selected_job_ids():
+    """Return the ids of the jobs selected in the queue list, in list order."""
+    return [job_id for job_id in filtered_ids if job_id in selected_ids]
+
+def cancel_selected():
+    """Cancel the jobs selected in the queue list."""
+    for job_id in selected_job_ids():
+        if daemon_port is not None:
+            daemon_action(job_id, 'cancel')
+        else:
+            engine.cancel_job(job_id)
+
+def move_selected(offset):
+    """Move the selected queued jobs up or down, keeping the list in queue order."""
+    job_ids = selected_job_ids()
+    if offset > 0:
+        job_ids.reverse()
+    for job_id in job_ids:
+        if daemon_port is not None:
+            other_id = daemon_action(job_id, f'move?offset={offset}', 'swapped_with')
+        else:
+            other_id = engine.move_job(job_id, offset)
+        if other_id is not None:
+            # Swap the two rows; rows of running/finished jobs in between stay put
+            index, other_index = job_order.index(job_id), job_order.index(other_id)
+            job_order[index], job_order[other_index] = other_id, job_id
+    apply_job_filter()
+
+def prioritize_selected():
+    """Download the selected jobs first, at high bandwidth priority."""
+    # Reversed, so the first selected job ends up at the front of the queue
+    for job_id in reversed(selected_job_ids()):
+        if daemon_port is not None:
+            other_id = daemon_action(job_id, 'prioritize', 'previous_first')
+        else:
+            other_id = engine.prioritize_job(job_id)
+        if other_id is not None:
+            job_order.remove(job_id)
+            job_order.insert(job_order.index(other_id), job_id)
+    apply_job_filter()
+
+def on_bandwidth_limit_changed():
+    """Apply and save the bandwidth limit chosen in the spinbox."""
+    try:
+        limit_kb = int(limit_var.get())
+    except (ValueError, tk.TclError):
+        return
+    engine.set_bandwidth_limit(limit_kb)
+    engine.save_config(bandwidth_limit_kb=engine.bandwidth_limit)
+
+def on_workers_changed():
+    """Apply and save the parallel download count chosen in the spinbox."""
+    try:
+        count = int(workers_var.get())
+    except (ValueError, tk.TclError):
+        return
+    engine.set_max_workers(count)
+    engine.save_config(max_workers=engine.max_workers)
+
+def audio_format_names():
+    """Names shown in the audio format box, in the order of AUDIO_FORMATS."""
+    return [translations[current_lang]['audio_original'] if name == 'original' else name.upper()
+            for name in engine.AUDIO_FORMATS]
+
+def on_audio_format_changed(event=None):
+    """Apply and save the audio format chosen in the combobox."""
+    index = audio_format_combo.current()
+    if index < 0:
+        return
+    engine.set_audio_format(engine.AUDIO_FORMATS[index])
+    engine.save_config(audio_format=engine.audio_format)
+
+def on_fragment_cap_changed():
+    """Apply and save the fragment cap chosen in the spinbox."""
+    try:
+        cap = int(fragments_var.get())
+    except (ValueError, tk.TclError):
+        return
+    engine.set_fragment_cap(cap)
+    engine.save_config(fragment_cap=engine.fragment_cap)
 
 # GUI Setup
+threading.Thread(target=warm_up, daemon=True).start()
+
 root = tk.Tk()
 root.title(translations[current_lang]['title'])
-root.geometry("550x400")
-
-# Check dependencies before continuing
-if not check_dependencies():
-    root.destroy()
-    exit(1)
+root.geometry("720x620")
+root.bind('<Map>', mark_window_shown)
 
 download_path = ""
 
@@ -511,31 +1217,159 @@ download_type_label = tk.Label(frame, text=translations[current_lang]['download_
 download_type_label.grid(row=2, column=0, pady=8, sticky="W")
 
 # Radiobuttons for selection
-video_radio = tk.Radiobutton(frame, text=translations[current_lang]['type_video'], 
+type_frame = tk.Frame(frame)
+type_frame.grid(row=2, column=1, columnspan=3, pady=8, sticky="W", padx=(10, 0))
+
+video_radio = tk.Radiobutton(type_frame, text=translations[current_lang]['type_video'], 
                              variable=download_type_var, value='video', font=("Arial", 10))
-video_radio.grid(row=2, column=1, pady=8, sticky="W", padx=(10, 5))
+video_radio.pack(side="left", padx=(0, 5))
 
-audio_radio = tk.Radiobutton(frame, text=translations[current_lang]['type_audio'], 
+audio_radio = tk.Radiobutton(type_frame, text=translations[current_lang]['type_audio'], 
                              variable=download_type_var, value='audio', font=("Arial", 10))
-audio_radio.grid(row=2, column=2, pady=8, sticky="W", padx=(5, 0))
+audio_radio.pack(side="left", padx=5)
+
+# Video + Audio: one download, the audio file is made from the video locally
+both_radio = tk.Radiobutton(type_frame, text=translations[current_lang]['type_both'],
+                            variable=download_type_var, value='both', font=("Arial", 10))
+both_radio.pack(side="left", padx=5)
+
+# Playlist mode: enumerate playlists/channels lazily and queue every entry as its own job
+playlist_var = tk.BooleanVar(value=False)
+playlist_check = tk.Checkbutton(type_frame, text=translations[current_lang]['playlist_mode'],
+                                variable=playlist_var, font=("Arial", 10))
+playlist_check.pack(side="left", padx=(5, 0))
 
-# ROW 3: Download Button
+# ROW 3: Download Button and bulk paste (preview of many links before queueing)
 indir_button = tk.Button(frame, text=translations[current_lang]['download_button'], 
                          command=indir_video, font=("Arial", 11, "bold"), 
                          relief="raised", bd=2, height=2)
-indir_button.grid(row=3, column=0, columnspan=4, pady=15, sticky="ew")
+indir_button.grid(row=3, column=0, columnspan=3, pady=15, sticky="ew")
+
+bulk_button = tk.Button(frame, text=translations[current_lang]['bulk_button'],
+                        command=open_bulk_paste, font=("Arial", 10), relief="raised", bd=2, height=2)
+bulk_button.grid(row=3, column=3, pady=15, padx=(5, 0), sticky="ew")
+
+# ROW 4: Queue Label and Parallel Download Count
+queue_label = tk.Label(frame, text=translations[current_lang]['queue_label'], font=("Arial", 10))
+queue_label.grid(row=4, column=0, pady=(8, 0), sticky="W")
+
+settings_frame = tk.Frame(frame)
+settings_frame.grid(row=4, column=1, columnspan=3, pady=(8, 0), sticky="E")
+
+workers_label = tk.Label(settings_frame, text=translations[current_lang]['workers_label'], font=("Arial", 10))
+workers_label.pack(side="left")
+
+workers_var = tk.StringVar(value=str(engine.DEFAULT_MAX_WORKERS))
+workers_spinbox = tk.Spinbox(settings_frame, from_=1, to=engine.MAX_WORKERS_LIMIT, width=4, font=("Arial", 10),
+                             textvariable=workers_var, command=on_workers_changed)
+workers_spinbox.pack(side="left", padx=(5, 0))
+workers_spinbox.bind('<Return>', lambda event: on_workers_changed())
+workers_spinbox.bind('<FocusOut>', lambda event: on_workers_changed())
 
-# ROW 4: Progress Bar
+# Global limit of parallel HLS/DASH fragments shared by all running jobs
+fragments_label = tk.Label(settings_frame, text=translations[current_lang]['fragments_label'], font=("Arial", 10))
+fragments_label.pack(side="left", padx=(15, 0))
+
+fragments_var = tk.StringVar(value=str(engine.DEFAULT_FRAGMENT_CAP))
+fragments_spinbox = tk.Spinbox(settings_frame, from_=1, to=engine.FRAGMENT_CAP_LIMIT, width=4, font=("Arial", 10),
+                               textvariable=fragments_var, command=on_fragment_cap_changed)
+fragments_spinbox.pack(side="left", padx=(5, 0))
+fragments_spinbox.bind('<Return>', lambda event: on_fragment_cap_changed())
+fragments_spinbox.bind('<FocusOut>', lambda event: on_fragment_cap_changed())
+
+# Audio output format; "Original" avoids re-encoding whenever possible
+audio_format_label = tk.Label(settings_frame, text=translations[current_lang]['audio_format_label'], font=("Arial", 10))
+audio_format_label.pack(side="left", padx=(15, 0))
+
+audio_format_combo = ttk.Combobox(settings_frame, values=audio_format_names(), state="readonly",
+                                  width=16, font=("Arial", 10))
+audio_format_combo.current(engine.AUDIO_FORMATS.index(engine.DEFAULT_AUDIO_FORMAT))
+audio_format_combo.pack(side="left", padx=(5, 0))
+audio_format_combo.bind('<<ComboboxSelected>>', on_audio_format_changed)
+
+# ROW 5: Job List Filter (text in title/link, and state)
+filter_frame = tk.Frame(frame)
+filter_frame.grid(row=5, column=0, columnspan=4, pady=(5, 0), sticky="ew")
+
+filter_label = tk.Label(filter_frame, text=translations[current_lang]['filter_label'], font=("Arial", 10))
+filter_label.pack(side="left")
+
+job_filter_var = tk.StringVar()
+filter_entry = tk.Entry(filter_frame, textvariable=job_filter_var, font=("Arial", 10))
+filter_entry.pack(side="left", fill="x", expand=True, padx=(5, 0))
+
+state_filter_combo = ttk.Combobox(filter_frame, values=state_filter_names(), state="readonly",
+                                  width=16, font=("Arial", 10))
+state_filter_combo.current(0)
+state_filter_combo.pack(side="left", padx=(5, 0))
+state_filter_combo.bind('<<ComboboxSelected>>', on_filter_changed)
+job_filter_var.trace_add('write', on_filter_changed)
+
+# ROW 6: Job List (virtual, see render_job_rows)
+job_tree = ttk.Treeview(frame, columns=('title', 'type', 'state', 'progress'),
+                        show='headings', height=8)
+job_tree.column('title', width=260)
+job_tree.column('type', width=90)
+job_tree.column('state', width=200)
+job_tree.column('progress', width=70, anchor='e')
+job_tree.grid(row=6, column=0, columnspan=4, pady=(5, 0), sticky="nsew")
+job_tree.bind('<Configure>', on_job_tree_resized)
+job_tree.bind('<<TreeviewSelect>>', on_job_selection_changed)
+for wheel_event in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+    job_tree.bind(wheel_event, on_job_wheel)
+# A plain click starts a new selection; Ctrl/Shift+click extend it
+job_tree.bind('<Button-1>', lambda event: selected_ids.clear())
+job_tree.bind('<Control-Button-1>', lambda event: None)
+job_tree.bind('<Shift-Button-1>', lambda event: None)
+
+job_scrollbar = ttk.Scrollbar(frame, orient='vertical', command=on_job_scroll)
+job_scrollbar.grid(row=6, column=4, pady=(5, 0), sticky="ns")
+
+frame.grid_rowconfigure(6, weight=1)
+frame.grid_columnconfigure(1, weight=1)
+
+# ROW 7: Queue Buttons
+queue_buttons = tk.Frame(frame)
+queue_buttons.grid(row=7, column=0, columnspan=4, pady=5, sticky="W")
+
+cancel_button = tk.Button(queue_buttons, text=translations[current_lang]['cancel_button'],
+                          command=cancel_selected, font=("Arial", 9), relief="raised", bd=2)
+cancel_button.pack(side="left")
+
+move_up_button = tk.Button(queue_buttons, text=translations[current_lang]['move_up_button'],
+                           command=lambda: move_selected(-1), font=("Arial", 9), relief="raised", bd=2)
+move_up_button.pack(side="left", padx=(5, 0))
+
+move_down_button = tk.Button(queue_buttons, text=translations[current_lang]['move_down_button'],
+                             command=lambda: move_selected(1), font=("Arial", 9), relief="raised", bd=2)
+move_down_button.pack(side="left", padx=(5, 0))
+
+priority_button = tk.Button(queue_buttons, text=translations[current_lang]['priority_button'],
+                            command=prioritize_selected, font=("Arial", 9), relief="raised", bd=2)
+priority_button.pack(side="left", padx=(5, 0))
+
+# Bandwidth limit shared by all running downloads (0 = unlimited)
+limit_label = tk.Label(queue_buttons, text=translations[current_lang]['limit_label'], font=("Arial", 10))
+limit_label.pack(side="left", padx=(15, 0))
+
+limit_var = tk.StringVar(value=str(engine.DEFAULT_BANDWIDTH_LIMIT))
+limit_spinbox = tk.Spinbox(queue_buttons, from_=0, to=engine.BANDWIDTH_LIMIT_MAX, increment=100, width=7,
+                           font=("Arial", 10), textvariable=limit_var, command=on_bandwidth_limit_changed)
+limit_spinbox.pack(side="left", padx=(5, 0))
+limit_spinbox.bind('<Return>', lambda event: on_bandwidth_limit_changed())
+limit_spinbox.bind('<FocusOut>', lambda event: on_bandwidth_limit_changed())
+
+# ROW 8: Progress Bar (average of running jobs)
 progress_bar = ttk.Progressbar(frame, length=400, mode='determinate', maximum=100)
-progress_bar.grid(row=4, column=0, columnspan=4, pady=8, sticky="ew")
+progress_bar.grid(row=8, column=0, columnspan=4, pady=8, sticky="ew")
 
-# ROW 5: Progress Label
+# ROW 9: Progress Label (queue summary)
 progress_label = tk.Label(frame, text="", font=("Arial", 9))
-progress_label.grid(row=5, column=0, columnspan=4, pady=5)
+progress_label.grid(row=9, column=0, columnspan=4, pady=5)
 
-# ROW 6: Message Label
+# ROW 10: Message Label
 message_label = tk.Label(frame, text="", font=("Arial", 9))
-message_label.grid(row=6, column=0, columnspan=4, pady=8)
+message_label.grid(row=10, column=0, columnspan=4, pady=8)
 
 # Create menu bar
 menu_bar = tk.Menu(root)
@@ -556,9 +1390,17 @@ theme_menu.add_command(label=translations[current_lang]['light_theme'],
 theme_menu.add_command(label=translations[current_lang]['dark_theme'], 
                        command=lambda: set_theme('dark'))
 
+# Archive menu
+archive_menu = tk.Menu(menu_bar, tearoff=0)
+menu_bar.add_cascade(label=translations[current_lang]['archive_menu'], menu=archive_menu)
+archive_menu.add_command(label=translations[current_lang]['archive_import'], command=import_archive)
+archive_menu.add_command(label=translations[current_lang]['archive_export'], command=export_archive)
+archive_menu.add_separator()
+archive_menu.add_command(label=translations[current_lang]['subs_menu'], command=open_subscriptions)
+
 # Load config and apply saved settings
 try:
-    config = load_config()
+    config = engine.load_config()
     saved_lang = config.get('language', 'en')
     saved_theme = config.get('theme', 'dark')
     
@@ -566,11 +1408,37 @@ try:
         current_lang = saved_lang
     if saved_theme != current_theme:
         current_theme = saved_theme
+    engine.apply_config(config)
+    workers_var.set(str(engine.max_workers))
+    fragments_var.set(str(engine.fragment_cap))
+    limit_var.set(str(engine.bandwidth_limit))
+    audio_format_combo.current(engine.AUDIO_FORMATS.index(engine.audio_format))
+    if config.get('metrics_port'):
+        engine.start_api_server(config['metrics_port'])
+    if config.get('use_daemon'):
+        connect_daemon(config.get('daemon_port', engine.DEFAULT_DAEMON_PORT))
 except:
     pass
 
+# Queue the jobs the last session did not finish (a daemon keeps its own journal)
+if daemon_port is None:
+    resumed_jobs = engine.open_journal()
+    if resumed_jobs:
+        print(f"Resumed {len(resumed_jobs)} unfinished jobs from the job journal")
+    # Subscriptions are checked by whichever process downloads (GUI or daemon)
+    if resumed_jobs is not None:
+        engine.start_subscriptions()
+
 # Apply initial theme and language
 apply_theme()
 update_interface()
+if daemon_port is not None:
+    message_label.config(text=translations[current_lang]['message_daemon'].format(port=daemon_port))
+
+# Start redrawing queued/running jobs from the main loop
+root.after(UI_REFRESH_MS, process_ui_events)
+
+# Check dependencies once the background warm-up is done
+root.after(UI_REFRESH_MS, on_engine_ready)
 
 root.mainloop()